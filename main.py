@@ -3,7 +3,49 @@
 DeepSeek R1 with LangGraph - Main entry point
 """
 import argparse
-from src.agent import run_agent
+import logging
+import sys
+# Only light imports up here: a query answered by the daemon never loads
+# langchain in this process
+from src.daemon.client import DEFAULT_SOCKET, DaemonUnavailable, query_daemon
+from src.llm.cascade import parse_models
+
+
+def setup_logging(args, stream_tokens=True, default_level=logging.INFO):
+    """Configure logging from the --quiet/--verbose/--log-json flags."""
+    from src.log import configure_logging
+
+    if args.quiet:
+        configure_logging(logging.WARNING, json_format=args.log_json)
+    else:
+        configure_logging(logging.DEBUG if args.verbose else default_level,
+                          stream_tokens=stream_tokens, json_format=args.log_json)
+
+
+def run_in_process(args):
+    """Answer the query in this process, for when no daemon is running."""
+    from src.agent import run_agent
+
+    setup_logging(args)
+
+    if args.warm_up:
+        from src.llm.warmup import warm_up
+        warm_up(args.models)
+
+    if args.profile:
+        from utils.profiling import AgentProfiler, print_profile_summary, slugify
+        with AgentProfiler(args.profile, slugify(args.query)) as profiler:
+            response = run_agent(args.query, models=args.models,
+                                 callbacks=[profiler.callback])
+        print_profile_summary(profiler)
+        return response
+    return run_agent(args.query, models=args.models)
+
+
+def write_token(text):
+    """Echo a token streamed from the daemon."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
 
 
 def main():
@@ -21,15 +63,94 @@ def main():
         help='Query to run'
     )
 
+    parser.add_argument(
+        '--models',
+        type=parse_models,
+        help='Comma-separated model cascade, cheapest first (e.g. qwen2.5:1.5b,qwen2.5:7b)'
+    )
+
+    parser.add_argument(
+        '--warm-up',
+        action='store_true',
+        help='Load the models and prime the system prompt before running the query'
+    )
+
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='profiles',
+        metavar='DIR',
+        help='Write CPU (pstats, collapsed stacks) and allocation profiles of the run to DIR'
+    )
+
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        '--quiet',
+        action='store_true',
+        help='Only log warnings and errors, without streaming model tokens'
+    )
+    verbosity.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Also log the agent trace (actions, observations, fallbacks)'
+    )
+
+    parser.add_argument(
+        '--log-json',
+        action='store_true',
+        help='Write log records as JSON lines'
+    )
+
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Run as a resident daemon that answers queries from later invocations'
+    )
+
+    parser.add_argument(
+        '--socket',
+        default=DEFAULT_SOCKET,
+        help='Unix domain socket of the daemon'
+    )
+
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Run the query in this process even if a daemon is running'
+    )
+
     # Parse arguments
     args = parser.parse_args()
 
+    if args.serve:
+        # Tokens of every client's queries would interleave on the daemon's
+        # stdout, and the agent's INFO records quote the users' queries
+        setup_logging(args, stream_tokens=False, default_level=logging.WARNING)
+        from src.daemon.server import serve
+        serve(args.socket, args.models)
+        return 0
+
     # Run the agent
     print(f"Running query: {args.query}")
-    response = run_agent(args.query)
+    response = None
+    # Profiles, warm-up reports and the agent trace are about this process,
+    # so those runs stay in-process
+    if not (args.no_daemon or args.profile or args.warm_up or args.verbose):
+        try:
+            response = query_daemon(args.query, args.models,
+                                    on_token=None if args.quiet else write_token,
+                                    socket_path=args.socket)
+        except DaemonUnavailable:
+            pass
+        except (RuntimeError, ConnectionError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if response is None:
+        response = run_in_process(args)
     print("\nResponse:")
     print(response)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
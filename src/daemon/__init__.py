@@ -0,0 +1,9 @@
+"""
+Resident agent daemon for DeepSeek R1 LangGraph Agent
+
+Only the client is exported here; the server lives in src.daemon.server so
+that importing the client stays free of langchain.
+"""
+from src.daemon.client import DEFAULT_SOCKET, DaemonUnavailable, query_daemon
+
+__all__ = ["DEFAULT_SOCKET", "DaemonUnavailable", "query_daemon"]
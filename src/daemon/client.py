@@ -0,0 +1,90 @@
+"""
+Thin client for the resident agent daemon
+
+Only the standard library is imported here, so a client invocation starts in
+milliseconds instead of paying for the langchain imports on every query.
+
+The wire protocol is JSON lines over a Unix domain socket. The client sends
+one request, {"query": ..., "models": [...] or null, "stream": bool}, and the
+daemon answers with any number of {"event": "token", "text": ...} lines
+followed by {"event": "result", "response": ...} or
+{"event": "error", "message": ...}.
+"""
+import json
+import os
+import socket
+import tempfile
+from typing import Callable, List, Optional
+
+TOKEN = "token"
+RESULT = "result"
+ERROR = "error"
+
+# Per user, so the socket's 0600 mode keeps other users out
+DEFAULT_SOCKET = os.environ.get("AGENT_SOCKET") or os.path.join(
+    tempfile.gettempdir(), f"custom_llm-agent-{os.getuid()}.sock")
+
+
+class DaemonUnavailable(Exception):
+    """Raised when no daemon is listening on the socket."""
+
+
+def connect(socket_path: str = DEFAULT_SOCKET, timeout: float = 0.5) -> socket.socket:
+    """
+    Connect to the daemon.
+
+    Args:
+        socket_path: Path of the daemon's Unix domain socket
+        timeout: Seconds to wait for the connection
+
+    Returns:
+        The connected socket, in blocking mode
+
+    Raises:
+        DaemonUnavailable: If nothing is listening on the socket
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except OSError as e:
+        # A missing socket, or one left behind by a daemon that died
+        sock.close()
+        raise DaemonUnavailable(f"No agent daemon on {socket_path}: {e}") from e
+    sock.settimeout(None)
+    return sock
+
+
+def query_daemon(query: str, models: Optional[List[str]] = None,
+                 on_token: Optional[Callable[[str], None]] = None,
+                 socket_path: str = DEFAULT_SOCKET) -> str:
+    """
+    Run a query on the daemon, streaming the model's tokens as they arrive.
+
+    Args:
+        query: The user's query
+        models: Model cascade, cheapest first (defaults to the daemon's)
+        on_token: Called with each streamed token; None turns streaming off
+        socket_path: Path of the daemon's Unix domain socket
+
+    Returns:
+        The agent's response
+
+    Raises:
+        DaemonUnavailable: If no daemon is running
+        RuntimeError: If the daemon failed to answer the query
+        ConnectionError: If the daemon went away mid-query
+    """
+    with connect(socket_path) as sock:
+        request = {"query": query, "models": models, "stream": on_token is not None}
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as lines:
+            for line in lines:
+                event = json.loads(line)
+                if event["event"] == TOKEN:
+                    on_token(event["text"])
+                elif event["event"] == RESULT:
+                    return event["response"]
+                else:
+                    raise RuntimeError(f"Agent daemon error: {event['message']}")
+    raise ConnectionError("The agent daemon closed the connection before answering")
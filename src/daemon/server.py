@@ -0,0 +1,180 @@
+"""
+Resident agent daemon
+
+A one-shot `python main.py "..."` spends most of its time before the first
+token importing langchain, starting tool worker processes and loading the
+model. The daemon pays for that once: it keeps the imports, the tool
+executor's warm workers and the resident models alive, and serves queries
+from thin clients (src.daemon.client) over a Unix domain socket, streaming
+the model's tokens back as they arrive.
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.agent import create_agent, run_agent, set_agent_caching
+from src.daemon.client import DEFAULT_SOCKET, ERROR, RESULT, TOKEN
+from src.llm.warmup import ResidencyManager, warm_up
+from src.tools import get_tool_executor
+
+logger = logging.getLogger(__name__)
+
+
+class _TokenForwarder(BaseCallbackHandler):
+    """Sends streamed model tokens to the client."""
+
+    def __init__(self, send: Callable[[Dict], None]):
+        self.send = send
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.send({"event": TOKEN, "text": token})
+
+    def on_llm_end(self, response, **kwargs):
+        # Same line break the in-process token stream ends each call with
+        self.send({"event": TOKEN, "text": "\n"})
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers one query per connection."""
+
+    def handle(self):
+        lock = threading.Lock()
+        closed = threading.Event()
+
+        def send(event: Dict) -> None:
+            # Tokens can come from more than one agent thread
+            with lock:
+                if closed.is_set():
+                    return
+                try:
+                    self.wfile.write(json.dumps(event).encode() + b"\n")
+                except OSError:
+                    # The client went away; let the query finish quietly
+                    closed.set()
+
+        try:
+            request = json.loads(self.rfile.readline())
+            query = request["query"]
+        except (ValueError, KeyError, TypeError) as e:
+            send({"event": ERROR, "message": f"Bad request: {e}"})
+            return
+
+        models = request.get("models") or self.server.models
+        callbacks = [_TokenForwarder(send)] if request.get("stream", True) else None
+        start_time = time.time()
+        try:
+            response = run_agent(query, models=models, callbacks=callbacks)
+        except Exception as e:
+            logger.exception("Daemon query failed")
+            send({"event": ERROR, "message": str(e)})
+            return
+
+        # Metadata only: the daemon serves every client of the user, and
+        # their queries don't belong in its log
+        elapsed = time.time() - start_time
+        logger.info("Daemon query answered in %.2fs (%d characters)", elapsed, len(query),
+                    extra={"event": "daemon_query", "seconds": round(elapsed, 3),
+                           "query_chars": len(query), "response_chars": len(response),
+                           "models": models})
+        send({"event": RESULT, "response": response})
+
+
+class AgentDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server that answers agent queries from a warm process."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET,
+                 models: Optional[List[str]] = None):
+        """
+        Args:
+            socket_path: Path of the Unix domain socket to listen on
+            models: Default model cascade for queries that don't name one
+
+        Raises:
+            RuntimeError: If another daemon is already listening on the socket
+        """
+        self.socket_path = socket_path
+        self.models = models
+        self.residency = None
+        _remove_stale_socket(socket_path)
+        # Created 0600 from the start: a chmod after bind would leave a
+        # window in which other users could connect
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(umask)
+        # Queries with the same models reuse one agent instead of building it
+        set_agent_caching(True)
+
+    def warm(self) -> None:
+        """Start the tool workers, load the models and keep them resident."""
+        # Builds and caches the default agent, and starts the tool
+        # executor's warm workers
+        create_agent(models=self.models)
+        try:
+            warm_up(self.models)
+        except Exception as e:
+            # Still worth serving: the imports and tool workers are warm
+            logger.warning("Could not warm up the models: %s", e)
+        self.residency = ResidencyManager(self.models).start()
+
+    def server_close(self) -> None:
+        super().server_close()
+        set_agent_caching(False)
+        if self.residency is not None:
+            self.residency.stop()
+        get_tool_executor().shutdown()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Remove a socket file left by a daemon that died, refusing to steal a live one."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise RuntimeError(f"An agent daemon is already running on {socket_path}")
+    finally:
+        probe.close()
+
+
+def serve(socket_path: str = DEFAULT_SOCKET, models: Optional[List[str]] = None,
+          warm: bool = True) -> None:
+    """
+    Run the daemon until it is interrupted or terminated.
+
+    Args:
+        socket_path: Path of the Unix domain socket to listen on
+        models: Default model cascade, warmed up and kept resident
+        warm: Warm up the tool workers and models before serving
+    """
+    # Turn SIGTERM into a normal exit so the socket file is cleaned up
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    with AgentDaemon(socket_path, models) as server:
+        if warm:
+            server.warm()
+        logger.info("Agent daemon listening on %s", socket_path,
+                    extra={"event": "daemon_start", "socket": socket_path})
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,13 @@
+"""
+LLM helpers for DeepSeek R1 LangGraph Agent
+"""
+__all__ = ["estimate_tokens", "estimate_message_tokens"]
+
+
+def __getattr__(name):
+    # Imported on first use, so that light modules such as src.llm.cascade
+    # can be loaded by the daemon client without pulling in langchain
+    if name in __all__:
+        from src.llm import tokens
+        return getattr(tokens, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
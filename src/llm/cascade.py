@@ -0,0 +1,48 @@
+"""
+Escalation signals for the small-to-large model cascade
+"""
+import json
+from typing import List, Optional
+
+# Reasons for escalating to a larger model
+PARSE_FAILURE = "parse_failure"
+INVALID_TOOL = "invalid_tool"
+NO_FINAL_ANSWER = "no_final_answer"
+VERIFIER_REJECTED = "verifier_rejected"
+
+
+def check_action(text: str, valid_actions: List[str]) -> Optional[str]:
+    """
+    Check whether a cleaned model response is a usable action blob.
+
+    Args:
+        text: Model response after clean_response
+        valid_actions: Accepted "action" values ("Final Answer" and tool names)
+
+    Returns:
+        PARSE_FAILURE or INVALID_TOOL when the step should be escalated,
+        None when the response is usable
+    """
+    try:
+        blob = json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return PARSE_FAILURE
+
+    if not isinstance(blob, dict) or "action" not in blob:
+        return PARSE_FAILURE
+    if blob["action"] not in valid_actions:
+        return INVALID_TOOL
+    return None
+
+
+def parse_models(value: str) -> List[str]:
+    """
+    Parse a comma-separated model cascade, cheapest model first.
+
+    Args:
+        value: e.g. "qwen2.5:1.5b,qwen2.5:7b"
+
+    Returns:
+        List of model names
+    """
+    return [model.strip() for model in value.split(",") if model.strip()]
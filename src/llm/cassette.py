@@ -0,0 +1,202 @@
+"""
+Record/replay cassettes for LLM traffic
+
+A cassette is a JSON lines file with one chat exchange per line: the request
+payload, the streamed content chunks with their arrival delays, and the
+final chunk's token counts. Record it once against a live Ollama server and
+tests can replay it offline, deterministically and without waiting for the
+model.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List
+
+from src.llm.transport import OllamaTransport, get_default_transport, set_default_transport
+
+# Cassette modes
+ONCE = "once"        # Replay the cassette if it exists, otherwise record it
+REPLAY = "replay"    # Replay only; requests missing from the cassette are errors
+RECORD = "record"    # Always record, overwriting the cassette
+LIVE = "live"        # Bypass cassettes and call the model
+
+# Replay timings
+ZERO = "zero"            # Replay chunks as fast as they are read
+ORIGINAL = "original"    # Wait between chunks as long as the model did
+
+CASSETTE_MODES = (ONCE, REPLAY, RECORD, LIVE)
+
+
+class CassetteMismatch(Exception):
+    """Raised when a replayed request has no recorded exchange."""
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """
+    Identify a request by its content.
+
+    Args:
+        payload: /api/chat request body
+
+    Returns:
+        Hash of the canonical JSON form of the payload
+    """
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class RecordingTransport:
+    """Passes requests to another transport and records the exchanges."""
+
+    def __init__(self, path: str, inner=None):
+        """
+        Args:
+            path: Cassette file written by save()
+            inner: Transport that serves the requests (defaults to Ollama)
+        """
+        self.path = path
+        self.inner = inner or OllamaTransport()
+        self.interactions: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def stream_chat(self, payload: Dict[str, Any]) -> Iterator[bytes]:
+        """Stream a response from the inner transport, recording it."""
+        chunks = []
+        done = {}
+        last = time.perf_counter()
+        try:
+            for line in self.inner.stream_chat(payload):
+                now = time.perf_counter()
+                if line:
+                    data = json.loads(line)
+                    chunks.append([round((now - last) * 1000),
+                                   data.get("message", {}).get("content", "")])
+                    if data.get("done"):
+                        done = {key: value for key, value in data.items()
+                                if key.endswith("_count") or key.endswith("_duration")}
+                last = now
+                yield line
+        except GeneratorExit:
+            # The caller stopped reading (e.g. a cancelled hedged request):
+            # keep what arrived so the replay is cut short the same way
+            self._record(payload, chunks, done)
+            raise
+        # Failed requests propagate without being recorded, so replaying
+        # them fails loudly as well
+        self._record(payload, chunks, done)
+
+    def _record(self, payload: Dict[str, Any], chunks: List[list], done: Dict[str, Any]) -> None:
+        with self._lock:
+            self.interactions.append({
+                "key": request_key(payload),
+                "request": payload,
+                "chunks": chunks,
+                "done": done,
+            })
+
+    def save(self) -> None:
+        """Write the recorded exchanges to the cassette file, if there are any."""
+        if not self.interactions:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path, "w", encoding="utf-8") as f:
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction, ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+
+
+class ReplayTransport:
+    """Serves recorded exchanges instead of calling the model.
+
+    Requests are matched on their full payload. Identical requests are
+    served in recording order, and the last exchange is repeated once they
+    run out.
+    """
+
+    def __init__(self, path: str, timing: str = ZERO):
+        """
+        Args:
+            path: Cassette file to replay
+            timing: ZERO to replay instantly, ORIGINAL to keep recorded delays
+        """
+        self.path = path
+        self.timing = timing
+        self._exchanges: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        # A missing cassette is only an error once a request needs it, so
+        # tests that never call the model don't need one
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self._exchanges.setdefault(interaction["key"], deque()).append(interaction)
+
+    def stream_chat(self, payload: Dict[str, Any]) -> Iterator[bytes]:
+        """Stream the recorded response to a request."""
+        key = request_key(payload)
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                prompt = payload.get("messages", [{}])[-1].get("content", "")
+                if not os.path.exists(self.path):
+                    raise CassetteMismatch(
+                        f"Cassette {self.path} has not been recorded. Record it against "
+                        "a running Ollama server with CASSETTE_MODE=record.")
+                raise CassetteMismatch(
+                    f"No recorded exchange in {self.path} for a {payload.get('model')} "
+                    f"request (key {key}) with prompt ending: ...{prompt[-200:]!r}. "
+                    "Re-record the cassette with CASSETTE_MODE=record.")
+            interaction = exchanges.popleft() if len(exchanges) > 1 else exchanges[0]
+
+        chunks = interaction["chunks"]
+        for i, (delay_ms, content) in enumerate(chunks):
+            if self.timing == ORIGINAL:
+                time.sleep(delay_ms / 1000)
+            line = {"message": {"role": "assistant", "content": content}}
+            if i == len(chunks) - 1 and interaction["done"]:
+                # Ollama's final chunk carries the token counts
+                line.update(done=True, **interaction["done"])
+            yield json.dumps(line).encode("utf-8")
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = ONCE, timing: str = ZERO):
+    """
+    Route all DeepSeekLLM traffic through a cassette.
+
+    Args:
+        path: Cassette file
+        mode: ONCE, REPLAY, RECORD or LIVE
+        timing: Replay timing, ZERO or ORIGINAL
+
+    Yields:
+        The transport in use
+    """
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {CASSETTE_MODES}")
+
+    if mode == LIVE:
+        yield get_default_transport()
+        return
+
+    if mode == REPLAY or (mode == ONCE and os.path.exists(path)):
+        transport = ReplayTransport(path, timing)
+    else:
+        transport = RecordingTransport(path)
+
+    previous = set_default_transport(transport)
+    try:
+        yield transport
+    finally:
+        set_default_transport(previous)
+    # Only reached without an exception, so a failed run never leaves a
+    # partial cassette behind
+    if isinstance(transport, RecordingTransport):
+        transport.save()
@@ -0,0 +1,38 @@
+"""
+Cheap token estimates for budgeting prompts without a tokenizer
+"""
+from typing import Iterable
+from langchain_core.messages import BaseMessage
+
+# Roughly four characters per token for English text with BPE tokenizers
+CHARS_PER_TOKEN = 4
+
+# Role label and separators added when a message is rendered into the prompt
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(messages: Iterable[BaseMessage]) -> int:
+    """
+    Estimate the number of prompt tokens a list of messages occupies.
+
+    Args:
+        messages: Messages that will be rendered into the prompt
+
+    Returns:
+        Estimated token count
+    """
+    return sum(estimate_tokens(str(message.content)) + MESSAGE_OVERHEAD_TOKENS
+               for message in messages)
@@ -0,0 +1,119 @@
+"""
+Transport between DeepSeekLLM and the Ollama chat API
+
+DeepSeekLLM sends every chat request through a transport, which streams back
+Ollama's raw response lines. Swapping the transport (see src.llm.cassette)
+lets tests record and replay model traffic without touching the agent.
+"""
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+
+OLLAMA_URL = "http://localhost:11434"
+
+# How long Ollama keeps a model loaded after the last request
+DEFAULT_KEEP_ALIVE = "30m"
+
+_default_transport = None
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Get the HTTP session shared by everything that talks to Ollama.
+
+    Reusing its pooled connections saves a TCP handshake per model call.
+
+    Returns:
+        The shared session
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        return _session
+
+
+class OllamaTransport:
+    """Streams /api/chat responses from a running Ollama server."""
+
+    def __init__(self, base_url: str = OLLAMA_URL, session: Optional[requests.Session] = None):
+        """
+        Args:
+            base_url: Address of the Ollama server
+            session: HTTP session to send requests with (defaults to the
+                shared one)
+        """
+        self.base_url = base_url
+        self.session = session or get_session()
+
+    def is_available(self, timeout: float = 1.0) -> bool:
+        """
+        Check whether the Ollama server answers.
+
+        Args:
+            timeout: Seconds to wait for the server
+
+        Returns:
+            True if the server responded
+        """
+        try:
+            self.session.get(f"{self.base_url}/api/version", timeout=timeout)
+        except requests.RequestException:
+            return False
+        return True
+
+    def stream_chat(self, payload: Dict[str, Any]) -> Iterator[bytes]:
+        """
+        Send a chat request and stream the response.
+
+        Closing the returned generator closes the HTTP response, which stops
+        generation on the server.
+
+        Args:
+            payload: /api/chat request body
+
+        Returns:
+            Iterator over the raw JSON lines of the streamed response
+        """
+        response = self.session.post(
+            f"{self.base_url}/api/chat",
+            json=payload,
+            stream=True
+        )
+        try:
+            yield from response.iter_lines()
+        finally:
+            response.close()
+
+
+def get_default_transport():
+    """
+    Get the transport used by DeepSeekLLM instances that don't set their own.
+
+    Returns:
+        The default transport (an OllamaTransport unless replaced)
+    """
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = OllamaTransport()
+    return _default_transport
+
+
+def set_default_transport(transport: Optional[Any]):
+    """
+    Replace the default transport.
+
+    Args:
+        transport: Object with a stream_chat(payload) method, or None to go
+            back to an OllamaTransport
+
+    Returns:
+        The previous default transport
+    """
+    global _default_transport
+    previous = get_default_transport()
+    _default_transport = transport
+    return previous
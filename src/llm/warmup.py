@@ -0,0 +1,209 @@
+"""
+Model warm-up and residency management for the local Ollama server
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+import requests
+
+from src.agent import DEFAULT_MODEL, render_system_prompt
+from src.llm.transport import DEFAULT_KEEP_ALIVE, OLLAMA_URL, get_session
+from src.tools import get_all_tools
+
+logger = logging.getLogger(__name__)
+
+KeepAlive = Union[str, int]
+
+
+def get_resident_models() -> List[str]:
+    """
+    List the models currently loaded by Ollama.
+
+    Returns:
+        Names of the resident models
+    """
+    response = get_session().get(f"{OLLAMA_URL}/api/ps", timeout=10)
+    response.raise_for_status()
+    return [model["name"] for model in response.json().get("models", [])]
+
+
+def load_model(model: str, keep_alive: KeepAlive = DEFAULT_KEEP_ALIVE) -> float:
+    """
+    Load a model into memory and set how long it stays resident.
+
+    A generate request without a prompt makes Ollama load the model without
+    running inference. Repeating it refreshes the keep-alive timer.
+
+    Args:
+        model: Model to load
+        keep_alive: Residency duration ("30m", seconds, or -1 for forever)
+
+    Returns:
+        Seconds the request took
+    """
+    start_time = time.time()
+    response = get_session().post(
+        f"{OLLAMA_URL}/api/generate",
+        json={"model": model, "keep_alive": keep_alive},
+        timeout=600
+    )
+    response.raise_for_status()
+    return time.time() - start_time
+
+
+def measure_first_token(model: str, prompt: str,
+                        keep_alive: KeepAlive = DEFAULT_KEEP_ALIVE) -> float:
+    """
+    Measure the time to the first streamed token for a prompt.
+
+    Only one token is generated, so the time is dominated by model loading
+    (if the model isn't resident) and prompt prefill. Running it also leaves
+    the prompt in Ollama's prompt cache.
+
+    Args:
+        model: Model to call
+        prompt: Prompt to send
+        keep_alive: Residency duration passed with the request
+
+    Returns:
+        Seconds until the first token arrived
+    """
+    start_time = time.time()
+    response = get_session().post(
+        f"{OLLAMA_URL}/api/chat",
+        json={
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "keep_alive": keep_alive,
+            "options": {"num_predict": 1},
+        },
+        stream=True,
+        timeout=600
+    )
+    response.raise_for_status()
+    try:
+        for line in response.iter_lines():
+            if line:
+                return time.time() - start_time
+    finally:
+        response.close()
+    return time.time() - start_time
+
+
+def warm_up(models: Optional[List[str]] = None, keep_alive: KeepAlive = DEFAULT_KEEP_ALIVE,
+            prime_prompt: bool = True) -> Dict[str, Dict]:
+    """
+    Load models and prime the static system prompt before serving queries.
+
+    For each model the first request is timed as the cold first-token
+    latency (it includes loading the model if it wasn't resident and
+    prefilling the system prompt). A second request with the same prefix
+    and a different question gives the warm first-token latency.
+
+    Args:
+        models: Models to warm up (defaults to DEFAULT_MODEL)
+        keep_alive: Residency duration for the loaded models
+        prime_prompt: Prefill the agent's system prompt, not just load weights
+
+    Returns:
+        Mapping of model name to its warm-up report
+    """
+    models = models or [DEFAULT_MODEL]
+    resident = set(_resident_or_empty())
+
+    # The agent flattens its chat prompt to "System: ...\nHuman: ...", so
+    # this prefix matches what real queries start with
+    prefix = f"System: {render_system_prompt(get_all_tools())}\nHuman: "
+
+    report = {}
+    for model in models:
+        logger.info("Warming up %s", model, extra={"event": "warm_up", "model": model})
+        if prime_prompt:
+            cold = measure_first_token(model, prefix + "Hello", keep_alive)
+            warm = measure_first_token(model, prefix + "What is 2 + 2?", keep_alive)
+        else:
+            cold = load_model(model, keep_alive)
+            warm = load_model(model, keep_alive)
+
+        report[model] = {
+            "was_resident": model in resident,
+            "cold_first_token": round(cold, 3),
+            "warm_first_token": round(warm, 3),
+        }
+        logger.info("%s: cold first token %.2fs, warm first token %.2fs%s",
+                    model, cold, warm, " (already resident)" if model in resident else "",
+                    extra={"event": "warm_up_report", "model": model, **report[model]})
+
+    return report
+
+
+class ResidencyManager:
+    """Background thread that keeps models loaded in Ollama.
+
+    Every interval it refreshes each model's keep-alive timer, reloading
+    any model that Ollama has unloaded (for example after a restart or
+    memory pressure) so a user request never pays the load time.
+    """
+
+    def __init__(self, models: Optional[List[str]] = None,
+                 keep_alive: KeepAlive = DEFAULT_KEEP_ALIVE, interval: float = 60.0):
+        """
+        Args:
+            models: Models to keep resident (defaults to DEFAULT_MODEL)
+            keep_alive: Residency duration requested on every refresh
+            interval: Seconds between refreshes; keep it well below keep_alive
+        """
+        self.models = models or [DEFAULT_MODEL]
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ResidencyManager":
+        """Start the background refresh thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="residency-manager", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def refresh(self) -> None:
+        """Refresh keep-alive timers and reload unloaded models once."""
+        resident = set(_resident_or_empty())
+        for model in self.models:
+            if model not in resident:
+                logger.warning("Model %s is not resident, reloading", model,
+                               extra={"event": "model_reload", "model": model})
+                self.reloads += 1
+            try:
+                load_model(model, self.keep_alive)
+            except requests.RequestException as e:
+                logger.error("Error keeping %s resident: %s", model, e)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def __enter__(self) -> "ResidencyManager":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def _resident_or_empty() -> List[str]:
+    """List resident models, treating an unreachable server as none resident."""
+    try:
+        return get_resident_models()
+    except requests.RequestException:
+        return []
@@ -0,0 +1,141 @@
+"""
+Leveled, queue-backed logging for DeepSeek R1 LangGraph Agent
+
+Modules log through the standard `logging` module under the "src" logger.
+Until configure_logging() is called nothing below WARNING is emitted, which
+is the right default for batch and server use. configure_logging() installs
+a QueueHandler, so the agent's threads only enqueue records and a listener
+thread does the actual console writes.
+
+Streamed model tokens go to the separate STREAM_LOGGER at TRACE level and
+are only formatted when token streaming is switched on.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional, TextIO
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Level for per-token output, below DEBUG
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+ROOT_LOGGER = "src"
+STREAM_LOGGER = "src.stream"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# Record attributes that are not user-supplied `extra` fields
+_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in record.__dict__.items()
+                      if key not in _RECORD_ATTRIBUTES})
+        return json.dumps(entry, default=str)
+
+
+class _StreamFilter(logging.Filter):
+    """Passes either only token records or everything except them."""
+
+    def __init__(self, tokens: bool):
+        super().__init__()
+        self.tokens = tokens
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return (record.name == STREAM_LOGGER) == self.tokens
+
+
+def configure_logging(level: int = logging.INFO, stream_tokens: bool = False,
+                      json_format: bool = False, queued: bool = True,
+                      stream: Optional[TextIO] = None) -> None:
+    """
+    Configure agent logging. Safe to call again to reconfigure.
+
+    Args:
+        level: Minimum level for agent log records
+        stream_tokens: Echo streamed model tokens to stdout as they arrive
+        json_format: Emit log records as JSON lines instead of text
+        queued: Hand records to a background listener thread instead of
+            writing them on the calling thread
+        stream: Where log records are written (defaults to stderr)
+    """
+    shutdown_logging()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers.clear()
+    root.setLevel(level)
+    root.propagate = False
+    logging.getLogger(STREAM_LOGGER).setLevel(
+        TRACE if stream_tokens else logging.CRITICAL + 1)
+
+    console = logging.StreamHandler(stream or sys.stderr)
+    console.addFilter(_StreamFilter(tokens=False))
+    console.setFormatter(JsonFormatter() if json_format else logging.Formatter(
+        "%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+
+    tokens = logging.StreamHandler(sys.stdout)
+    tokens.terminator = ""
+    tokens.addFilter(_StreamFilter(tokens=True))
+    tokens.setFormatter(logging.Formatter("%(message)s"))
+
+    if not queued:
+        root.addHandler(console)
+        root.addHandler(tokens)
+        return
+
+    global _listener
+    records = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(records))
+    _listener = logging.handlers.QueueListener(
+        records, console, tokens, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+class LoggingCallbackHandler(BaseCallbackHandler):
+    """Logs the agent's actions, observations and final answers at DEBUG.
+
+    Replaces the executor's verbose=True stdout printing, so the trace goes
+    through the logging pipeline and costs nothing when DEBUG is off.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("src.agent.trace")
+
+    def on_agent_action(self, action, **kwargs):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Action %s: %s", action.tool, action.tool_input,
+                              extra={"event": "agent_action", "tool": action.tool})
+
+    def on_tool_end(self, output, **kwargs):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Observation: %s", output, extra={"event": "observation"})
+
+    def on_agent_finish(self, finish, **kwargs):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Final answer: %s", finish.return_values.get("output"),
+                              extra={"event": "agent_finish"})
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Multi-turn agent sessions with bounded, compacted conversation memory
+"""
+import re
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, get_buffer_string
+
+from src.agent import DEFAULT_MODEL, AgentState, DeepSeekLLM, run_agent
+from src.llm.tokens import CHARS_PER_TOKEN, estimate_message_tokens
+
+# Summarizer signature: (previous summary, newly evicted messages) -> new summary
+Summarizer = Callable[[str, List[BaseMessage]], str]
+
+# Whitespace after the end of a sentence, or a line break
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+
+
+def llm_summarizer(model_version: str = DEFAULT_MODEL, max_words: int = 120) -> Summarizer:
+    """
+    Create a summarizer that folds evicted turns into the rolling summary.
+
+    Only the previous summary and the newly evicted turns are sent to the
+    model, so each compaction costs one short call regardless of how long
+    the conversation has been running.
+
+    Args:
+        model_version: Ollama model used for summarization
+        max_words: Word limit requested for the summary
+
+    Returns:
+        Summarizer function
+    """
+    def summarize(summary: str, messages: List[BaseMessage]) -> str:
+        llm = DeepSeekLLM(model_version=model_version)
+        prompt = f"""Update the running summary of a conversation between a user and an AI assistant.
+Keep every number, result and fact the user may refer back to. Use at most {max_words} words.
+Reply with the updated summary only.
+
+Current summary:
+{summary or "(empty)"}
+
+New conversation turns:
+{get_buffer_string(messages)}"""
+        return llm.invoke(prompt).strip()
+
+    return summarize
+
+
+def trim_summary(summary: str, max_chars: int) -> str:
+    """
+    Fit a summary into a character budget without cutting a sentence in half.
+
+    Whole sentences (or lines) are dropped from the front, oldest first. Only
+    a single sentence longer than the whole budget is cut, at a word boundary.
+
+    Args:
+        summary: The summary to trim
+        max_chars: Character budget
+
+    Returns:
+        The summary, or its latest sentences that fit in max_chars
+    """
+    summary = summary.strip()
+    if len(summary) <= max_chars:
+        return summary
+
+    kept = []
+    length = -1
+    for sentence in reversed(_SENTENCE_BREAK.split(summary)):
+        length += len(sentence) + 1
+        if length > max_chars:
+            break
+        kept.insert(0, sentence)
+    if kept:
+        return " ".join(kept)
+
+    # Drop the partial word the cut leaves at the front
+    tail = summary[-max_chars:]
+    return tail.split(None, 1)[-1] if " " in tail else tail
+
+
+class _ActionRecorder(BaseCallbackHandler):
+    """Records tool calls and their results into the session state."""
+
+    def __init__(self, actions: List[dict]):
+        self.actions = actions
+        self._pending = {}
+
+    def on_agent_action(self, action, *, run_id, **kwargs):
+        # Parse-error pseudo actions are not real tool calls
+        if action.tool != "_Exception":
+            self._pending[run_id] = {"tool": action.tool, "input": action.tool_input}
+
+    def on_tool_end(self, output, *, run_id, parent_run_id=None, **kwargs):
+        entry = self._pending.pop(parent_run_id, None)
+        if entry is not None:
+            entry["output"] = str(output)
+            self.actions.append(entry)
+
+
+class AgentSession:
+    """A multi-turn conversation with the agent.
+
+    The session keeps the full transcript in an AgentState but only sends a
+    bounded window of it to the model: the most recent turns that fit in
+    history_token_budget, preceded by a rolling summary of everything older.
+    When the window overflows, the oldest turns are folded into the summary
+    incrementally instead of re-summarizing the whole conversation.
+    """
+
+    def __init__(self, session_id: Optional[str] = None, history_token_budget: int = 1024,
+                 summary_token_budget: int = 256, min_recent_turns: int = 1,
+                 summarizer: Optional[Summarizer] = None, **run_kwargs):
+        """
+        Args:
+            session_id: Identifier of the session (generated if omitted)
+            history_token_budget: Token budget for the summary plus the
+                recent turns sent with each query
+            summary_token_budget: Hard cap on the rolling summary size
+            min_recent_turns: Number of latest turns that are never compacted
+            summarizer: Function folding evicted turns into the summary
+            **run_kwargs: Extra keyword arguments passed to run_agent
+        """
+        self.session_id = session_id or uuid.uuid4().hex
+        self.history_token_budget = history_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.min_recent_turns = min_recent_turns
+        self.summarizer = summarizer or llm_summarizer()
+        self.run_kwargs = run_kwargs
+
+        self.state: AgentState = {"messages": [], "actions": []}
+        self.summary = ""
+        # Messages before this index have been folded into the summary
+        self.window_start = 0
+        self.last_active = time.time()
+        self._lock = threading.Lock()
+
+    def history_messages(self) -> List[BaseMessage]:
+        """
+        Get the bounded history sent to the model with the next query.
+
+        Returns:
+            The rolling summary (if any) followed by the recent turns
+        """
+        history = []
+        if self.summary:
+            history.append(SystemMessage(
+                content=f"Summary of the earlier conversation: {self.summary}"))
+        history.extend(self.state["messages"][self.window_start:])
+        return history
+
+    def history_tokens(self) -> int:
+        """Estimate the prompt tokens used by the bounded history."""
+        return estimate_message_tokens(self.history_messages())
+
+    def compact(self) -> None:
+        """Fold the oldest turns into the summary until the window fits the budget."""
+        messages = self.state["messages"]
+        # Each turn is a human message followed by the AI response
+        keep_from = max(len(messages) - 2 * self.min_recent_turns, 0)
+
+        new_start = self.window_start
+        while new_start < keep_from and self._window_tokens(new_start) > self.history_token_budget:
+            new_start += 2
+
+        if new_start == self.window_start:
+            return
+
+        max_chars = self.summary_token_budget * CHARS_PER_TOKEN
+        summary = self.summarizer(self.summary, messages[self.window_start:new_start])
+        if len(summary) > max_chars:
+            # Ask for a tighter summary before dropping anything
+            summary = self.summarizer(summary, [])
+        self.summary = trim_summary(summary, max_chars)
+        self.window_start = new_start
+
+    def run(self, query: str, **run_kwargs) -> str:
+        """
+        Run one turn of the conversation.
+
+        Args:
+            query: The user's query
+            **run_kwargs: Keyword arguments for run_agent, overriding the
+                session defaults for this turn
+
+        Returns:
+            The agent's response
+        """
+        with self._lock:
+            self.compact()
+
+            kwargs = dict(self.run_kwargs, **run_kwargs)
+            callbacks = list(kwargs.pop("callbacks", None) or [])
+            callbacks.append(_ActionRecorder(self.state["actions"]))
+
+            response = run_agent(query, chat_history=self.history_messages(),
+                                 callbacks=callbacks, **kwargs)
+
+            self.state["messages"].append(HumanMessage(content=query))
+            self.state["messages"].append(AIMessage(content=response))
+            self.last_active = time.time()
+            return response
+
+    def _window_tokens(self, start: int) -> int:
+        """Estimate tokens of the summary plus the messages from start onwards."""
+        window = self.state["messages"][start:]
+        # Count a summary at its cap: it may grow when more turns are folded in
+        summary_tokens = self.summary_token_budget if self.summary or start > self.window_start else 0
+        return summary_tokens + estimate_message_tokens(window)
+
+
+class SessionStore(ABC):
+    """Storage backend for agent sessions."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[AgentSession]:
+        """Return the session with the given id, or None if it doesn't exist."""
+
+    @abstractmethod
+    def put(self, session: AgentSession) -> None:
+        """Store a session, evicting others if the store is full."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove a session from the store."""
+
+
+class InMemorySessionStore(SessionStore):
+    """In-process session store with LRU and idle-time eviction."""
+
+    def __init__(self, max_sessions: int = 128, ttl_seconds: Optional[float] = 3600):
+        """
+        Args:
+            max_sessions: Maximum number of sessions kept; the least recently
+                used session is evicted beyond this
+            ttl_seconds: Sessions idle for longer than this are evicted
+                (None keeps them until LRU eviction)
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[AgentSession]:
+        with self._lock:
+            self._evict_expired()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def put(self, session: AgentSession) -> None:
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            self._evict_expired()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict_expired(self) -> None:
+        if self.ttl_seconds is None:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        for session_id in [sid for sid, session in self._sessions.items()
+                           if session.last_active < cutoff]:
+            del self._sessions[session_id]
+
+
+_default_store = InMemorySessionStore()
+
+
+def get_session(session_id: Optional[str] = None, store: Optional[SessionStore] = None,
+                **session_kwargs) -> AgentSession:
+    """
+    Get an existing session or create a new one.
+
+    Args:
+        session_id: Id of the session to resume (a new session is created if
+            it is unknown or omitted)
+        store: Session store to use (defaults to a process-wide in-memory store)
+        **session_kwargs: Arguments for AgentSession when creating a session
+
+    Returns:
+        The agent session
+    """
+    if store is None:
+        store = _default_store
+    session = store.get(session_id) if session_id else None
+    if session is None:
+        session = AgentSession(session_id=session_id, **session_kwargs)
+        store.put(session)
+    return session
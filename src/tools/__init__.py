@@ -1,7 +1,7 @@
 """
 Tools package for DeepSeek R1 LangGraph Agent
 """
-from typing import List, Callable, Dict, Any
+from typing import List, Callable, Dict, Any, Optional
 from langchain_core.tools import BaseTool
 
 # Import all tools
@@ -11,10 +11,16 @@ from src.tools.moon_weather import moon_weather
 # Create a dictionary of tools with their prompt instructions
 from src.tools.computation import get_prompt_template as get_computation_prompt
 from src.tools.moon_weather import get_prompt_template as get_moon_weather_prompt
+from src.tools.computation import POLICY as computation_policy
+from src.tools.moon_weather import POLICY as moon_weather_policy
+from src.tools.execution import ToolExecutor, ToolPolicy, get_tool_executor
+from src.tools.retrieval import get_tool_index
 
 # Export all tools
 __all__ = ["custom_computation", "moon_weather",
-           "get_all_tools", "get_combined_prompt_template"]
+           "get_all_tools", "get_combined_prompt_template", "get_action_schema",
+           "select_tools", "get_tool_policies", "get_tool_executor",
+           "ToolExecutor", "ToolPolicy"]
 
 
 def get_all_tools() -> List[BaseTool]:
@@ -40,9 +46,25 @@ def get_tool_prompts() -> Dict[str, Callable[[], str]]:
     }
 
 
-def get_combined_prompt_template() -> str:
+def get_tool_policies() -> Dict[str, ToolPolicy]:
     """
-    Combines all tool-specific prompt templates into a single template.
+    Get a dictionary mapping tool names to their execution policies.
+
+    Returns:
+        Dictionary mapping tool names to the policy declared in each tool package
+    """
+    return {
+        "custom_computation": computation_policy,
+        "moon_weather": moon_weather_policy
+    }
+
+
+def get_combined_prompt_template(tool_names: Optional[List[str]] = None) -> str:
+    """
+    Combines tool-specific prompt templates into a single template.
+
+    Args:
+        tool_names: Only include the prompts of these tools (defaults to all tools)
 
     Returns:
         Combined prompt template
@@ -52,7 +74,72 @@ def get_combined_prompt_template() -> str:
 
     # Add prompt instructions for each tool
     for tool_name, get_prompt in tool_prompts.items():
+        if tool_names is not None and tool_name not in tool_names:
+            continue
         combined_prompt += get_prompt()
         combined_prompt += "\n\n"
 
     return combined_prompt
+
+
+def get_action_schema(tools: Optional[List[BaseTool]] = None) -> Dict[str, Any]:
+    """
+    Build a JSON schema describing every valid action blob.
+
+    The schema accepts a "Final Answer" action with a string input, plus one
+    action per tool whose input follows the tool's args_schema. Tools with a
+    single argument also accept a bare string input, matching the examples
+    in the prompt templates.
+
+    Args:
+        tools: Tools to include in the schema (defaults to all tools)
+
+    Returns:
+        JSON schema suitable for Ollama's `format` parameter
+    """
+    if tools is None:
+        tools = get_all_tools()
+
+    actions = [{
+        "type": "object",
+        "properties": {
+            "action": {"type": "string", "enum": ["Final Answer"]},
+            "action_input": {"type": "string"}
+        },
+        "required": ["action", "action_input"]
+    }]
+
+    for tool in tools:
+        input_schema = tool.args_schema.model_json_schema()
+        input_schema.pop("title", None)
+        if len(input_schema.get("properties", {})) == 1:
+            input_schema = {"anyOf": [{"type": "string"}, input_schema]}
+
+        actions.append({
+            "type": "object",
+            "properties": {
+                "action": {"type": "string", "enum": [tool.name]},
+                "action_input": input_schema
+            },
+            "required": ["action", "action_input"]
+        })
+
+    return {"anyOf": actions}
+
+
+def select_tools(query: str, top_k: int = 2) -> List[BaseTool]:
+    """
+    Select the tools most relevant to a query.
+
+    Args:
+        query: The user's query
+        top_k: Maximum number of tools to select
+
+    Returns:
+        The selected tools, or all tools when none is clearly relevant
+    """
+    selected = get_tool_index().select(query, top_k=top_k)
+    tools = get_all_tools()
+    if not selected:
+        return tools
+    return [tool for tool in tools if tool.name in selected]
@@ -1,7 +1,7 @@
 """
 Computation tool module for DeepSeek R1 LangGraph Agent
 """
-from src.tools.computation.tool import custom_computation, CustomToolInput
+from src.tools.computation.tool import custom_computation, CustomToolInput, POLICY
 from src.tools.computation.prompt import get_prompt_template
 
-__all__ = ["custom_computation", "CustomToolInput", "get_prompt_template"]
+__all__ = ["custom_computation", "CustomToolInput", "POLICY", "get_prompt_template"]
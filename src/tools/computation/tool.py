@@ -5,6 +5,13 @@ Custom computation tool implementation for DeepSeek R1 LangGraph Agent
 from langchain.tools import tool
 from pydantic import BaseModel, Field
 
+from src.tools.execution import PROCESS, ToolPolicy
+
+# eval can run away on inputs like 9**9**9, so it runs in a memory-limited
+# worker process that is killed when it overruns
+POLICY = ToolPolicy(executor=PROCESS, timeout=5.0, max_concurrency=2,
+                    memory_limit_mb=512, warm_workers=1)
+
 
 class CustomToolInput(BaseModel):
     """Input schema for the custom_computation tool."""
@@ -15,6 +22,9 @@ class CustomToolInput(BaseModel):
 def custom_computation(query: str) -> str:
     """Perform basic arithmetic computation or evaluate simple expressions.
 
+    Use it to add, subtract, multiply or divide numbers and to raise them
+    to powers.
+
     Args:
         query: A string containing a mathematical expression to evaluate.
 
@@ -28,5 +38,8 @@ def custom_computation(query: str) -> str:
     try:
         result = eval(query)
         return f"The result is {result}."
+    except MemoryError:
+        # Left to the worker, which reports it as the tool's memory limit
+        raise
     except Exception as e:
         return f"Error in computation: {e}"
@@ -0,0 +1,391 @@
+"""
+Isolated, time-limited tool execution for DeepSeek R1 LangGraph Agent
+
+Each tool declares a ToolPolicy in its package. Thread tools run in a
+per-tool thread pool; process tools run in warm, memory-limited worker
+processes that are killed and replaced when a call overruns its timeout.
+Failures come back to the agent as a JSON observation instead of an
+exception, so the agent can recover within the same request.
+"""
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Literal, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import BaseModel, Field
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; memory limits are skipped
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+THREAD = "thread"
+PROCESS = "process"
+
+# Error kinds reported in failure observations
+TIMEOUT = "timeout"
+BUSY = "busy"
+MEMORY_LIMIT = "memory_limit"
+WORKER_CRASHED = "worker_crashed"
+
+# Seconds a new worker process may take to start before it is given up on.
+# Startup doesn't count against a call's timeout
+WORKER_START_TIMEOUT = 60.0
+
+# Forked workers start from a server that has already imported the tools, so
+# replacing a killed worker doesn't pay for importing LangChain again
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _CONTEXT = multiprocessing.get_context("forkserver")
+    _CONTEXT.set_forkserver_preload(["src.tools"])
+else:
+    _CONTEXT = multiprocessing.get_context("spawn")
+
+_executor: Optional["ToolExecutor"] = None
+_executor_lock = threading.Lock()
+
+
+class ToolPolicy(BaseModel):
+    """How a tool is executed, declared next to the tool's implementation."""
+    executor: Literal["thread", "process"] = Field(
+        default=THREAD, description="Run calls in a thread pool or in worker processes")
+    timeout: float = Field(default=30.0, description="Seconds a call may take, including queueing")
+    max_concurrency: int = Field(default=4, description="Calls of this tool that may run at once")
+    memory_limit_mb: Optional[int] = Field(
+        default=None, description="Address space limit of each worker process")
+    warm_workers: int = Field(default=0, description="Worker processes started ahead of the first call")
+
+
+# Policy for tools that don't declare one
+DEFAULT_POLICY = ToolPolicy()
+
+
+def failure_observation(tool_name: str, error: str, message: str, **details: Any) -> str:
+    """
+    Build the observation returned to the agent when a tool call fails.
+
+    Args:
+        tool_name: Tool that failed
+        error: Error kind (TIMEOUT, BUSY, MEMORY_LIMIT or WORKER_CRASHED)
+        message: Explanation the model can act on
+        **details: Extra structured fields, e.g. timeout_seconds
+
+    Returns:
+        JSON object as a string
+    """
+    return json.dumps({"error": error, "tool": tool_name, "message": message, **details})
+
+
+def _worker_main(conn, memory_limit_mb: Optional[int]) -> None:
+    """Serve tool calls sent over a pipe until told to stop."""
+    if memory_limit_mb and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    # Imported here: the worker needs the plain tool functions, not the
+    # wrapped tools that dispatch back to an executor
+    from src.tools import get_all_tools
+    functions = {tool.name: tool.func for tool in get_all_tools()}
+
+    # A closed pipe means the executor went away, e.g. it was shut down
+    # while this worker was starting
+    try:
+        conn.send(("ready", None))
+        while True:
+            message = conn.recv()
+            if message is None:
+                return
+            name, kwargs = message
+            try:
+                reply = ("ok", functions[name](**kwargs))
+            except MemoryError:
+                reply = (MEMORY_LIMIT, "The tool ran out of memory")
+            except Exception as e:
+                reply = ("error", f"{type(e).__name__}: {e}")
+            conn.send(reply)
+    except (EOFError, BrokenPipeError, ConnectionResetError):
+        return
+
+
+class _ProcessWorker:
+    """One worker process and the pipe used to talk to it."""
+
+    def __init__(self, memory_limit_mb: Optional[int]):
+        self.conn, child_conn = _CONTEXT.Pipe()
+        self.process = _CONTEXT.Process(
+            target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def call(self, name: str, kwargs: Dict[str, Any], timeout: float):
+        """
+        Run a tool in the worker.
+
+        Returns:
+            (status, value) as sent by the worker, or (TIMEOUT, None)
+        """
+        if not self.ready:
+            if not self.conn.poll(WORKER_START_TIMEOUT):
+                return WORKER_CRASHED, None
+            self.conn.recv()
+            self.ready = True
+
+        self.conn.send((name, kwargs))
+        if not self.conn.poll(max(timeout, 0)):
+            return TIMEOUT, None
+        return self.conn.recv()
+
+    def stop(self, kill: bool = False) -> None:
+        """Stop the worker, killing it if it may be stuck in a call."""
+        if not kill:
+            try:
+                self.conn.send(None)
+                self.process.join(1)
+            except (BrokenPipeError, OSError):
+                pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class _ProcessPool:
+    """Warm worker processes for one tool, replaced after timeouts or crashes."""
+
+    def __init__(self, policy: ToolPolicy):
+        self.policy = policy
+        self._idle: List[_ProcessWorker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # Warm workers start in the background: the first one also starts
+        # the forkserver, which takes about a second
+        self._warmer = threading.Thread(
+            target=self._warm, args=(min(policy.warm_workers, policy.max_concurrency),),
+            name="tool-worker-warmup", daemon=True)
+        self._warmer.start()
+
+    def run(self, name: str, kwargs: Dict[str, Any], timeout: float):
+        """Run one call; the caller holds a concurrency slot."""
+        with self._lock:
+            worker = self._idle.pop() if self._idle else None
+        if worker is None:
+            worker = _ProcessWorker(self.policy.memory_limit_mb)
+
+        try:
+            status, value = worker.call(name, kwargs, timeout)
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            status, value = WORKER_CRASHED, None
+
+        if status in (TIMEOUT, WORKER_CRASHED):
+            # The worker may still be busy or may be dead: replace it in the
+            # background so the next call finds a warm one
+            worker.stop(kill=True)
+            threading.Thread(target=self._replace, name="tool-worker-restart",
+                             daemon=True).start()
+        else:
+            self._keep(worker, self.policy.max_concurrency)
+        return status, value
+
+    def _warm(self, count: int) -> None:
+        for _ in range(count):
+            self._keep(_ProcessWorker(self.policy.memory_limit_mb), self.policy.warm_workers)
+
+    def _replace(self) -> None:
+        self._keep(_ProcessWorker(self.policy.memory_limit_mb), self.policy.warm_workers)
+
+    def _keep(self, worker: _ProcessWorker, max_idle: int) -> None:
+        """Park a worker for later calls, or stop it if the pool is full or shut down."""
+        with self._lock:
+            if not self._closed and len(self._idle) < max_idle:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._idle = self._idle, []
+        # A worker still starting is stopped by _keep
+        self._warmer.join()
+        for worker in workers:
+            worker.stop()
+
+
+class ToolExecutor:
+    """Dispatches tool calls to per-tool thread pools or worker processes.
+
+    Every tool gets a concurrency limit. Calls beyond it wait for a free
+    slot, and the wait counts against the call's timeout. Thread tools that
+    time out keep running in the background (Python threads can't be
+    interrupted) but hold their slot until they finish; process tools that
+    time out are killed.
+    """
+
+    def __init__(self, policies: Optional[Dict[str, ToolPolicy]] = None):
+        """
+        Args:
+            policies: Mapping of tool name to its policy; tools without one
+                use DEFAULT_POLICY
+        """
+        self.policies = policies or {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._threads: Dict[str, ThreadPoolExecutor] = {}
+        self._processes: Dict[str, _ProcessPool] = {}
+        self._lock = threading.Lock()
+
+        for name, policy in self.policies.items():
+            if policy.executor == PROCESS and policy.warm_workers:
+                self._pool(name, policy)
+
+    def policy(self, tool_name: str) -> ToolPolicy:
+        """Get the policy a tool runs under."""
+        return self.policies.get(tool_name, DEFAULT_POLICY)
+
+    def run(self, tool: BaseTool, kwargs: Dict[str, Any]) -> Any:
+        """
+        Run a tool call under its policy.
+
+        Args:
+            tool: The tool to run
+            kwargs: The tool's arguments
+
+        Returns:
+            The tool's result, or a failure observation (see
+            failure_observation) when it timed out, was over capacity,
+            hit its memory limit or crashed
+        """
+        policy = self.policy(tool.name)
+        deadline = time.monotonic() + policy.timeout
+        slots = self._slot(tool.name, policy)
+        if not slots.acquire(timeout=policy.timeout):
+            logger.warning("Tool %s is at its concurrency limit", tool.name,
+                           extra={"event": "tool_busy", "tool": tool.name})
+            return failure_observation(
+                tool.name, BUSY,
+                f"{tool.name} is busy with {policy.max_concurrency} other calls. "
+                "Try again later or answer without it.",
+                max_concurrency=policy.max_concurrency)
+
+        if policy.executor == PROCESS:
+            try:
+                status, value = self._pool(tool.name, policy).run(
+                    tool.name, kwargs, deadline - time.monotonic())
+            finally:
+                slots.release()
+        else:
+            try:
+                future = self._thread_pool(tool.name, policy).submit(tool.func, **kwargs)
+            except BaseException:
+                # Nothing will run to give the slot back, e.g. after shutdown
+                slots.release()
+                raise
+            future.add_done_callback(lambda _: slots.release())
+            try:
+                status, value = "ok", future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                status, value = TIMEOUT, None
+
+        if status == "ok":
+            return value
+        if status == "error":
+            # Tool exceptions propagate as they would have inline
+            raise RuntimeError(value)
+        return self._failure(tool.name, policy, status, value)
+
+    def _failure(self, tool_name: str, policy: ToolPolicy, status: str,
+                 value: Optional[str]) -> str:
+        logger.warning("Tool %s failed: %s", tool_name, status,
+                       extra={"event": f"tool_{status}", "tool": tool_name})
+        if status == TIMEOUT:
+            return failure_observation(
+                tool_name, TIMEOUT,
+                f"{tool_name} did not finish within {policy.timeout}s. "
+                "Try a simpler input or answer without the tool.",
+                timeout_seconds=policy.timeout)
+        if status == MEMORY_LIMIT:
+            return failure_observation(
+                tool_name, MEMORY_LIMIT,
+                f"{tool_name} exceeded its {policy.memory_limit_mb} MB memory limit. "
+                "Try a smaller input.",
+                memory_limit_mb=policy.memory_limit_mb)
+        return failure_observation(
+            tool_name, WORKER_CRASHED, f"{tool_name} crashed before returning a result.")
+
+    def wrap(self, tool: BaseTool) -> BaseTool:
+        """
+        Make a copy of a tool whose calls go through this executor.
+
+        Args:
+            tool: Tool built with the @tool decorator
+
+        Returns:
+            Tool with the same name, description and schema
+        """
+        field_names = list(tool.args_schema.model_fields) if tool.args_schema else []
+
+        def dispatch(*args, **kwargs):
+            # A bare string action input arrives as a positional argument
+            kwargs.update(zip(field_names, args))
+            return self.run(tool, kwargs)
+
+        return StructuredTool.from_function(
+            func=dispatch,
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            return_direct=tool.return_direct,
+            infer_schema=False,
+        )
+
+    def shutdown(self) -> None:
+        """Stop all worker threads and processes."""
+        with self._lock:
+            threads, self._threads = self._threads, {}
+            processes, self._processes = self._processes, {}
+        for pool in threads.values():
+            pool.shutdown(wait=False)
+        for pool in processes.values():
+            pool.shutdown()
+
+    def _slot(self, tool_name: str, policy: ToolPolicy) -> threading.BoundedSemaphore:
+        with self._lock:
+            if tool_name not in self._slots:
+                self._slots[tool_name] = threading.BoundedSemaphore(policy.max_concurrency)
+            return self._slots[tool_name]
+
+    def _thread_pool(self, tool_name: str, policy: ToolPolicy) -> ThreadPoolExecutor:
+        with self._lock:
+            if tool_name not in self._threads:
+                self._threads[tool_name] = ThreadPoolExecutor(
+                    max_workers=policy.max_concurrency, thread_name_prefix=f"tool-{tool_name}")
+            return self._threads[tool_name]
+
+    def _pool(self, tool_name: str, policy: ToolPolicy) -> _ProcessPool:
+        with self._lock:
+            if tool_name not in self._processes:
+                self._processes[tool_name] = _ProcessPool(policy)
+            return self._processes[tool_name]
+
+
+def get_tool_executor() -> ToolExecutor:
+    """
+    Get the shared executor for the registered tools, starting it on first use.
+
+    Returns:
+        The tool executor
+    """
+    global _executor
+    # Locked so concurrent first calls don't each start a set of workers
+    with _executor_lock:
+        if _executor is None:
+            # Imported here to avoid a circular import with src.tools
+            from src.tools import get_tool_policies
+
+            _executor = ToolExecutor(get_tool_policies())
+        return _executor
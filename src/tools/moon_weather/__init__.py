@@ -1,7 +1,7 @@
 """
 Moon weather tool module for DeepSeek R1 LangGraph Agent
 """
-from src.tools.moon_weather.tool import moon_weather, MoonCoordinatesInput
+from src.tools.moon_weather.tool import moon_weather, MoonCoordinatesInput, POLICY
 from src.tools.moon_weather.prompt import get_prompt_template
 
-__all__ = ["moon_weather", "MoonCoordinatesInput", "get_prompt_template"]
+__all__ = ["moon_weather", "MoonCoordinatesInput", "POLICY", "get_prompt_template"]
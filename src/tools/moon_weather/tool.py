@@ -5,6 +5,10 @@ Moon weather tool implementation for DeepSeek R1 LangGraph Agent
 from langchain.tools import tool
 from pydantic import BaseModel, Field
 
+from src.tools.execution import THREAD, ToolPolicy
+
+POLICY = ToolPolicy(executor=THREAD, timeout=10.0, max_concurrency=4)
+
 
 class MoonCoordinatesInput(BaseModel):
     """Input schema for the moon_weather tool."""
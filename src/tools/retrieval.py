@@ -0,0 +1,145 @@
+"""
+Relevance-based tool selection for shrinking the system prompt
+"""
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List
+
+# Words that carry no signal about which tool a query needs
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from",
+    "how", "i", "if", "in", "is", "it", "its", "like", "me", "of", "on", "or",
+    "please", "the", "then", "that", "this", "to", "use", "what", "whats",
+    "when", "where", "which", "who", "with", "you", "your",
+}
+
+# Tokens are truncated to this length as a crude stemmer, so that
+# "calculate", "calculation" and "calculating" all match
+STEM_LENGTH = 6
+
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+EXPRESSION_PATTERN = re.compile(r"\d\s*[-+*/^%]\s*\(?\s*\d")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms.
+
+    Numbers are mapped to the placeholder term "#num" and each arithmetic
+    expression adds an "#expr" term, so that queries match the tool examples
+    they look like rather than the exact digits.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of index terms
+    """
+    terms = ["#expr"] * len(EXPRESSION_PATTERN.findall(text))
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token[0].isdigit():
+            terms.append("#num")
+        elif token not in STOP_WORDS:
+            terms.append(token[:STEM_LENGTH])
+    return terms
+
+
+class ToolIndex:
+    """BM25 index over tool descriptions and prompt instructions.
+
+    The index is built once from the registered tools; scoring a query only
+    touches the query's terms.
+    """
+
+    def __init__(self, documents: Dict[str, str], k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            documents: Mapping of tool name to the text describing the tool
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.term_counts = {name: Counter(tokenize(text))
+                            for name, text in documents.items()}
+        self.lengths = {name: sum(counts.values())
+                        for name, counts in self.term_counts.items()}
+        self.average_length = sum(self.lengths.values()) / max(len(documents), 1)
+
+        document_frequency = Counter()
+        for counts in self.term_counts.values():
+            document_frequency.update(counts.keys())
+        total = len(documents)
+        self.idf = {term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+                    for term, df in document_frequency.items()}
+
+    def score(self, query: str) -> Dict[str, float]:
+        """
+        Score every tool against a query.
+
+        Args:
+            query: The user's query
+
+        Returns:
+            Mapping of tool name to BM25 score
+        """
+        terms = set(tokenize(query))
+        scores = {}
+        for name, counts in self.term_counts.items():
+            norm = self.k1 * (1 - self.b + self.b *
+                              self.lengths[name] / self.average_length)
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term, 0)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores[name] = score
+        return scores
+
+    def select(self, query: str, top_k: int = 2, min_score: float = 1.0,
+               relative_threshold: float = 0.5) -> List[str]:
+        """
+        Pick the tools most relevant to a query.
+
+        Args:
+            query: The user's query
+            top_k: Maximum number of tools to return
+            min_score: Score the best tool must reach for the selection to
+                be trusted
+            relative_threshold: Other tools must score at least this
+                fraction of the best score to be included
+
+        Returns:
+            Names of the selected tools, best first, or an empty list when no
+            tool is clearly relevant and the caller should fall back to all
+            tools
+        """
+        ranked = sorted(self.score(query).items(),
+                        key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < min_score:
+            return []
+
+        cutoff = ranked[0][1] * relative_threshold
+        return [name for name, score in ranked[:top_k] if score >= cutoff]
+
+
+@lru_cache(maxsize=1)
+def get_tool_index() -> ToolIndex:
+    """
+    Get the index over all registered tools, building it on first use.
+
+    Returns:
+        The tool index
+    """
+    # Imported here to avoid a circular import with src.tools
+    from src.tools import get_all_tools, get_tool_prompts
+
+    prompts = get_tool_prompts()
+    documents = {
+        tool.name: " ".join([tool.name.replace("_", " "), tool.description,
+                             prompts[tool.name]() if tool.name in prompts else ""])
+        for tool in get_all_tools()
+    }
+    return ToolIndex(documents)
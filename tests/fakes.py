@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Fake Ollama transport shared by the unit tests
+
+Tests plug it in with set_default_transport (see FakeTransport.install) or
+pass it to DeepSeekLLM(transport=...), the same seam the cassettes use, so
+no test has to patch the HTTP layer.
+"""
+import json
+import time
+from typing import Dict, List, Optional, Union
+
+from src.llm.transport import set_default_transport
+
+Replies = Union[str, List[str], Dict[str, List[str]]]
+
+
+class FakeTransport:
+    """Answers chat requests with canned replies and keeps the payloads it was sent."""
+
+    def __init__(self, replies: Replies = "", chunk_size: Optional[int] = None,
+                 delay: float = 0.0, prompt_tokens: int = 12, completion_tokens: int = 3):
+        """
+        Args:
+            replies: One reply for every request, replies in request order,
+                or replies in order per model
+            chunk_size: Stream replies in chunks of this many characters
+                instead of in one piece
+            delay: Seconds to wait before each chunk
+            prompt_tokens: prompt_eval_count reported when a reply is done
+            completion_tokens: eval_count reported when a reply is done
+        """
+        if isinstance(replies, dict):
+            self.replies = {model: list(texts) for model, texts in replies.items()}
+        elif isinstance(replies, list):
+            self.replies = list(replies)
+        else:
+            self.replies = replies
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.payloads: List[Dict] = []
+
+    @property
+    def models(self) -> List[str]:
+        """Models requested so far, in order."""
+        return [payload["model"] for payload in self.payloads]
+
+    def install(self, test) -> "FakeTransport":
+        """Make this the default transport until the test finishes."""
+        previous = set_default_transport(self)
+        test.addCleanup(set_default_transport, previous)
+        return self
+
+    def reply(self, payload: Dict) -> str:
+        """Pick the reply to a request."""
+        if isinstance(self.replies, dict):
+            return self.replies[payload["model"]].pop(0)
+        if isinstance(self.replies, list):
+            return self.replies.pop(0)
+        return self.replies
+
+    def stream_chat(self, payload: Dict):
+        self.payloads.append(payload)
+        text = self.reply(payload)
+        size = self.chunk_size or max(len(text), 1)
+        for start in range(0, len(text), size):
+            time.sleep(self.delay)
+            yield json.dumps({"message": {"content": text[start:start + size]}}).encode()
+        yield json.dumps({"message": {"content": ""}, "done": True,
+                          "prompt_eval_count": self.prompt_tokens,
+                          "eval_count": self.completion_tokens}).encode()
@@ -2,24 +2,148 @@
 """
 Test runner script for DeepSeek R1 LangGraph Agent Integration Tests
 """
+import argparse
+import io
+import os
+import time
 import unittest
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from tests.test_agent import TestDeepSeekAgentIntegration
+from tests.test_action_parsing import TestActionParsing
+from tests.test_hedging import TestHedging
+from tests.test_session import TestAgentSession
+from tests.test_tool_retrieval import TestToolRetrieval
+from tests.test_cascade import TestModelCascade
+from tests.test_warmup import TestWarmup
+from tests.test_profiling import TestProfiling
+from tests.test_log import TestLogging
+from tests.test_tool_execution import TestToolExecution
+from tests.test_cassette import TestCassette
+from tests.test_benchmark_history import TestBenchmarkHistory
+from tests.test_evaluation import TestEvaluation
+from tests.test_daemon import TestDaemon
+from src.llm.cassette import CASSETTE_MODES
+
+
+def build_suite():
+    """Build the suite of all agent tests"""
+    loader = unittest.TestLoader()
+    return unittest.TestSuite([
+        loader.loadTestsFromTestCase(TestDeepSeekAgentIntegration),
+        loader.loadTestsFromTestCase(TestActionParsing),
+        loader.loadTestsFromTestCase(TestHedging),
+        loader.loadTestsFromTestCase(TestAgentSession),
+        loader.loadTestsFromTestCase(TestToolRetrieval),
+        loader.loadTestsFromTestCase(TestModelCascade),
+        loader.loadTestsFromTestCase(TestWarmup),
+        loader.loadTestsFromTestCase(TestProfiling),
+        loader.loadTestsFromTestCase(TestLogging),
+        loader.loadTestsFromTestCase(TestToolExecution),
+        loader.loadTestsFromTestCase(TestCassette),
+        loader.loadTestsFromTestCase(TestBenchmarkHistory),
+        loader.loadTestsFromTestCase(TestEvaluation),
+        loader.loadTestsFromTestCase(TestDaemon),
+    ])
 
 
 def run_tests():
     """Run all agent integration tests with detailed output"""
-    # Create a test suite
-    suite = unittest.TestLoader().loadTestsFromTestCase(TestDeepSeekAgentIntegration)
-
     # Run the tests with more detailed output
     runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    result = runner.run(build_suite())
 
     # Return success/failure code
     return 0 if result.wasSuccessful() else 1
 
 
+def _run_one(test_id):
+    """Run a single test in a worker process and report its outcome."""
+    stream = io.StringIO()
+    runner = unittest.TextTestRunner(stream=stream, verbosity=2)
+    result = runner.run(unittest.TestLoader().loadTestsFromName(test_id))
+    return {
+        "id": test_id,
+        "output": stream.getvalue(),
+        "failures": len(result.failures) + len(result.errors),
+        "skipped": len(result.skipped),
+    }
+
+
+def run_tests_parallel(workers):
+    """
+    Run every test in its own task across a pool of worker processes.
+
+    Each test's output is printed as a block once it finishes, in suite
+    order.
+
+    Args:
+        workers: Number of worker processes
+
+    Returns:
+        Exit code, 0 when all tests passed
+    """
+    test_ids = [test.id() for test in _flatten(build_suite())]
+    start_time = time.time()
+    failed = []
+    skipped = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for outcome in pool.map(_run_one, test_ids):
+            sys.stderr.write(outcome["output"])
+            skipped += outcome["skipped"]
+            if outcome["failures"]:
+                failed.append(outcome["id"])
+
+    print(f"\nRan {len(test_ids)} tests in {time.time() - start_time:.2f}s "
+          f"with {workers} workers ({skipped} skipped)")
+    if failed:
+        print(f"FAILED ({len(failed)}):")
+        for test_id in failed:
+            print(f"  {test_id}")
+        return 1
+    print("OK")
+    return 0
+
+
+def _flatten(suite):
+    for item in suite:
+        if isinstance(item, unittest.TestSuite):
+            yield from _flatten(item)
+        else:
+            yield item
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the agent tests")
+    parser.add_argument(
+        "--parallel",
+        nargs="?",
+        type=int,
+        const=os.cpu_count(),
+        default=0,
+        metavar="N",
+        help="Run tests across N worker processes (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--cassette-mode",
+        choices=CASSETTE_MODES,
+        help="once: replay recorded model traffic, recording it when missing; "
+             "replay: never call the model; record: re-record; live: skip cassettes"
+    )
+    parser.add_argument(
+        "--cassette-timing",
+        choices=("zero", "original"),
+        help="Replay cassettes instantly or with the recorded chunk timing"
+    )
+    args = parser.parse_args()
+
+    # Passed through the environment so worker processes see them too
+    if args.cassette_mode:
+        os.environ["CASSETTE_MODE"] = args.cassette_mode
+    if args.cassette_timing:
+        os.environ["CASSETTE_TIMING"] = args.cassette_timing
+
     print("Running DeepSeek R1 LangGraph Agent Integration Tests...")
+    if args.parallel:
+        sys.exit(run_tests_parallel(args.parallel))
     sys.exit(run_tests())
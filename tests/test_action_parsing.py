@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Unit tests for action extraction and the constrained output schema
+"""
+import json
+import unittest
+from src.agent import DeepSeekLLM, extract_action_blob
+from src.tools import get_action_schema, get_all_tools
+
+
+class TestActionParsing(unittest.TestCase):
+    """Tests for turning raw model output into parseable action blobs."""
+
+    def test_extracts_object_from_fenced_prose(self):
+        """Test the action blob is found inside markdown fences and prose."""
+        text = 'Sure!\n```json\n{"action": "custom_computation", "action_input": "2 + 2"}\n```\nDone.'
+        blob = extract_action_blob(text)
+        self.assertEqual(json.loads(blob), {
+            "action": "custom_computation", "action_input": "2 + 2"})
+
+    def test_ignores_braces_inside_strings(self):
+        """Test braces and escaped quotes inside strings don't end the object."""
+        text = '{"action": "Final Answer", "action_input": "use {x} and \\" }"} trailing }'
+        blob = extract_action_blob(text)
+        self.assertEqual(json.loads(blob)["action_input"], 'use {x} and " }')
+
+    def test_drops_trailing_commas(self):
+        """Test trailing commas before closing brackets are removed."""
+        blob = extract_action_blob(
+            '{"action": "moon_weather", "action_input": {"latitude": 1, "longitude": 2,},}')
+        self.assertEqual(json.loads(blob)["action_input"], {
+            "latitude": 1, "longitude": 2})
+
+    def test_no_object(self):
+        """Test text without a complete JSON object yields None."""
+        self.assertIsNone(extract_action_blob("The answer is 4."))
+        self.assertIsNone(extract_action_blob('{"action": "Final Answer"'))
+
+    def test_clean_response_falls_back_to_text(self):
+        """Test clean_response returns the bare text when there is no JSON."""
+        llm = DeepSeekLLM()
+        self.assertEqual(llm.clean_response(
+            "```json\nParis```"), "Paris")
+
+    def test_action_schema_covers_all_tools(self):
+        """Test the action schema has a branch for Final Answer and each tool."""
+        schema = get_action_schema()
+        actions = [branch["properties"]["action"]["enum"][0]
+                   for branch in schema["anyOf"]]
+        self.assertEqual(actions, ["Final Answer"] +
+                         [tool.name for tool in get_all_tools()])
+
+        # Single-argument tools also accept a bare string input
+        computation = schema["anyOf"][1]["properties"]["action_input"]
+        self.assertIn({"type": "string"}, computation["anyOf"])
+
+
+if __name__ == "__main__":
+    unittest.main()
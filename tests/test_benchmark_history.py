@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Unit tests for benchmark history and regression detection
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from utils.benchmark_history import (append_run, check_regression, compare_runs,
+                                     find_baseline, find_run, load_runs)
+from utils.stats import bootstrap_not_worse, fisher_exact_less, mann_whitney_greater
+
+BASELINE_LATENCIES = [1.0, 1.1, 0.9, 1.2, 1.0, 1.3, 1.1, 0.95, 1.05, 1.0]
+
+
+def make_summary(latencies, successes=None, models=None):
+    """Build the parts of a run_benchmark summary that the history stores."""
+    successes = successes or [True] * len(latencies)
+    return {
+        "config": {"models": models or ["small"], "questions": len(latencies)},
+        "latency": {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0},
+        "success_rate": sum(successes) / len(successes),
+        "results": [{"question": f"q{i}", "time_seconds": latency, "success": success}
+                    for i, (latency, success) in enumerate(zip(latencies, successes))],
+    }
+
+
+class TestBenchmarkHistory(unittest.TestCase):
+    """Tests for the benchmark history store and its statistical comparison."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.history_file = os.path.join(self.directory, "history.jsonl")
+
+    def record(self, latencies, successes=None, models=None, label=None):
+        return append_run(make_summary(latencies, successes, models), self.history_file, label)
+
+    def test_statistical_tests(self):
+        """Test the pure-Python tests separate shifted samples from similar ones."""
+        slower = [latency * 1.4 for latency in BASELINE_LATENCIES]
+        self.assertLess(mann_whitney_greater(slower, BASELINE_LATENCIES)[1], 0.01)
+        self.assertGreater(mann_whitney_greater(BASELINE_LATENCIES, BASELINE_LATENCIES)[1], 0.4)
+        self.assertLess(bootstrap_not_worse(slower, BASELINE_LATENCIES, 99), 0.05)
+
+        # Only one way to see 5 of 10 successes against 10 of 10: C(15,5)/C(20,10)
+        self.assertAlmostEqual(fisher_exact_less(5, 10, 10, 10), 3003 / 184756)
+        self.assertEqual(fisher_exact_less(10, 10, 10, 10), 1.0)
+
+    def test_runs_are_appended_with_tags(self):
+        """Test each run is appended with its git revision, models and config."""
+        self.record(BASELINE_LATENCIES, label="baseline")
+        self.record(BASELINE_LATENCIES, models=["large"])
+
+        runs = load_runs(self.history_file)
+        self.assertEqual(len(runs), 2)
+        self.assertEqual(runs[0]["label"], "baseline")
+        self.assertEqual(runs[1]["models"], ["large"])
+        self.assertIn("commit", runs[0]["git"])
+        self.assertNotEqual(runs[0]["config_key"], runs[1]["config_key"])
+        self.assertEqual(runs[0]["latencies"], BASELINE_LATENCIES)
+
+        self.assertIs(find_run(runs, "baseline"), runs[0])
+        self.assertIs(find_run(runs, "latest"), runs[1])
+        # The only earlier run used another model, so there's no baseline
+        self.assertIsNone(find_baseline(runs, runs[1]))
+
+    def test_latency_regression(self):
+        """Test a significantly slower run is flagged and a similar one is not."""
+        baseline = self.record(BASELINE_LATENCIES)
+        similar = self.record([latency + 0.01 for latency in BASELINE_LATENCIES])
+        slower = self.record([latency * 1.5 for latency in BASELINE_LATENCIES])
+
+        self.assertFalse(compare_runs(baseline, similar)["regressed"])
+        comparison = compare_runs(baseline, slower)
+        self.assertTrue(comparison["regressed"])
+        regressed = {check["metric"] for check in comparison["checks"] if check["regressed"]}
+        self.assertEqual(regressed, {"p50 latency", "p99 latency"})
+
+    def test_success_rate_regression(self):
+        """Test a significant drop in success rate is flagged."""
+        baseline = self.record(BASELINE_LATENCIES)
+        failing = self.record(BASELINE_LATENCIES, successes=[True] * 4 + [False] * 6)
+        one_failure = self.record(BASELINE_LATENCIES, successes=[True] * 9 + [False])
+
+        self.assertTrue(compare_runs(baseline, failing)["regressed"])
+        # A single failure out of ten isn't significant
+        self.assertFalse(compare_runs(baseline, one_failure)["regressed"])
+
+    def test_check_regression_exit_codes(self):
+        """Test the compare command's exit codes."""
+        self.assertEqual(check_regression(history_file=self.history_file), 2)
+        self.record(BASELINE_LATENCIES, label="baseline")
+        self.assertEqual(check_regression(history_file=self.history_file), 2)
+
+        self.record([latency * 1.01 for latency in BASELINE_LATENCIES])
+        self.assertEqual(check_regression(history_file=self.history_file), 0)
+        self.record([latency * 2 for latency in BASELINE_LATENCIES])
+        self.assertEqual(check_regression(baseline_ref="baseline",
+                                          history_file=self.history_file), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the small-to-large model cascade
+"""
+import argparse
+import unittest
+from src.agent import DeepSeekLLM, run_agent
+from src.llm.cascade import INVALID_TOOL, PARSE_FAILURE, check_action
+from tests.fakes import FakeTransport
+from utils.benchmark import parse_model_cost
+
+
+class TestModelCascade(unittest.TestCase):
+    """Tests for step and query escalation between models."""
+
+    def fake_ollama(self, replies):
+        """Serve replies[model] in order and record which models were called."""
+        self.transport = FakeTransport(replies, prompt_tokens=100).install(self)
+
+    def test_check_action(self):
+        """Test responses are classified by escalation signal."""
+        actions = ["Final Answer", "custom_computation"]
+        self.assertIsNone(check_action(
+            '{"action": "custom_computation", "action_input": "2+2"}', actions))
+        self.assertEqual(check_action("The answer is 4", actions), PARSE_FAILURE)
+        self.assertEqual(check_action('{"action": "calculator"}', actions), INVALID_TOOL)
+
+    def test_step_escalates_on_parse_failure(self):
+        """Test an unparseable step is retried on the larger model."""
+        self.fake_ollama({
+            "small": ["I think the answer is 4"],
+            "large": ['{"action": "Final Answer", "action_input": "4"}'],
+        })
+        llm = DeepSeekLLM(model_version="small", escalation_models=["large"],
+                          valid_actions=["Final Answer"])
+        result = llm.generate(["What is 2 + 2?"])
+
+        self.assertEqual(self.transport.models, ["small", "large"])
+        info = result.generations[0][0].generation_info
+        self.assertEqual(info["model"], "large")
+        self.assertEqual(info["attempts"][0]["escalation_reason"], PARSE_FAILURE)
+        self.assertEqual(info["attempts"][1]["prompt_tokens"], 100)
+
+    def test_valid_step_stays_on_small_model(self):
+        """Test a valid step never touches the larger model."""
+        self.fake_ollama({
+            "small": ['{"action": "Final Answer", "action_input": "Paris"}'],
+            "large": [],
+        })
+        response = run_agent("What is the capital of France?",
+                             models=["small", "large"])
+        self.assertEqual(response, "Paris")
+        self.assertEqual(self.transport.models, ["small"])
+
+    def test_query_escalates_when_verifier_rejects(self):
+        """Test a rejected answer reruns the query on the larger model."""
+        self.fake_ollama({
+            "small": ['{"action": "Final Answer", "action_input": "Lyon"}'],
+            "large": ['{"action": "Final Answer", "action_input": "Paris"}'],
+        })
+        response = run_agent("What is the capital of France?",
+                             models=["small", "large"],
+                             verifier=lambda query, answer: "Paris" in answer)
+        self.assertEqual(response, "Paris")
+        self.assertEqual(self.transport.models, ["small", "large"])
+
+    def test_query_escalates_without_final_answer(self):
+        """Test running out of iterations reruns the query on the larger model."""
+        tool_call = '{"action": "custom_computation", "action_input": "5 + 7"}'
+        self.fake_ollama({
+            "small": [tool_call, tool_call],
+            "large": [tool_call, '{"action": "Final Answer", "action_input": "12"}'],
+        })
+        response = run_agent("What is 5 + 7?", max_iterations=2,
+                             models=["small", "large"])
+        self.assertEqual(response, "12")
+        self.assertEqual(self.transport.models, ["small", "small", "large", "large"])
+
+    def test_parse_model_cost(self):
+        """Test MODEL=COST entries parse and malformed ones are rejected."""
+        self.assertEqual(parse_model_cost("qwen2.5:7b=0.02"), ("qwen2.5:7b", 0.02))
+        for value in ("qwen2.5:7b", "=0.02", "qwen2.5:7b=cheap", "qwen2.5:7b=-1", "m=nan"):
+            with self.subTest(value=value), self.assertRaises(argparse.ArgumentTypeError):
+                parse_model_cost(value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit tests for record/replay cassettes of LLM traffic
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from src.agent import DeepSeekLLM, run_agent
+from src.llm.cassette import (ORIGINAL, RECORD, REPLAY, CassetteMismatch,
+                              RecordingTransport, use_cassette)
+from tests.fakes import FakeTransport
+
+
+class TestCassette(unittest.TestCase):
+    """Tests for recording model traffic and replaying it offline."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "cassette.jsonl")
+
+    def record(self, prompt, text, delay=0.0):
+        inner = FakeTransport(text, chunk_size=4, delay=delay)
+        recorder = RecordingTransport(self.path, inner)
+        DeepSeekLLM(model_version="small", transport=recorder)._complete(prompt)
+        recorder.save()
+        return inner
+
+    def test_replay_matches_recording(self):
+        """Test a replayed request returns the recorded text and token counts."""
+        self.record("What is 2 + 2?", "The answer is 4")
+
+        with use_cassette(self.path, mode=REPLAY):
+            text, info = DeepSeekLLM(model_version="small")._complete("What is 2 + 2?")
+        self.assertEqual(text, "The answer is 4")
+        self.assertEqual(info["attempts"][0]["prompt_tokens"], 12)
+        self.assertEqual(info["attempts"][0]["completion_tokens"], 3)
+
+    def test_unmatched_request_fails_loudly(self):
+        """Test a request that wasn't recorded raises instead of calling the model."""
+        self.record("What is 2 + 2?", "The answer is 4")
+
+        with use_cassette(self.path, mode=REPLAY):
+            with self.assertRaises(CassetteMismatch):
+                DeepSeekLLM(model_version="small")._complete("What is 3 + 3?")
+            with self.assertRaises(CassetteMismatch):
+                DeepSeekLLM(model_version="large")._complete("What is 2 + 2?")
+
+    def test_replay_timing(self):
+        """Test zero timing replays instantly and original timing keeps the delays."""
+        self.record("Tell me a story", "Once upon a time", delay=0.05)
+
+        start_time = time.time()
+        with use_cassette(self.path, mode=REPLAY):
+            DeepSeekLLM(model_version="small")._complete("Tell me a story")
+        self.assertLess(time.time() - start_time, 0.1)
+
+        start_time = time.time()
+        with use_cassette(self.path, mode=REPLAY, timing=ORIGINAL):
+            DeepSeekLLM(model_version="small")._complete("Tell me a story")
+        self.assertGreaterEqual(time.time() - start_time, 0.15)
+
+    def test_cassette_is_compact(self):
+        """Test the cassette stores one line per exchange without raw Ollama chunks."""
+        self.record("What is 2 + 2?", "The answer is 4")
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        interaction = json.loads(lines[0])
+        self.assertEqual(interaction["request"]["model"], "small")
+        self.assertEqual([content for _, content in interaction["chunks"]],
+                         ["The ", "answ", "er i", "s 4", ""])
+
+    def test_missing_cassette_in_replay_mode(self):
+        """Test replay mode without a recorded cassette fails on the first request."""
+        with use_cassette(self.path, mode=REPLAY):
+            with self.assertRaisesRegex(CassetteMismatch, "has not been recorded"):
+                DeepSeekLLM(model_version="small")._complete("What is 2 + 2?")
+
+    def test_unmatched_request_fails_through_the_agent(self):
+        """Test the agent's error fallbacks don't turn a cassette mismatch into an answer."""
+        with use_cassette(self.path, mode=REPLAY):
+            for hedge in (False, True):
+                with self.subTest(hedge=hedge):
+                    # A general question also goes through the direct-answer fallback
+                    with self.assertRaises(CassetteMismatch):
+                        run_agent("What is the capital of France?", hedge=hedge,
+                                  hedge_delay=0.01)
+            with self.assertRaises(CassetteMismatch):
+                run_agent("What is 5 divided by 0?")
+
+    def test_record_mode_overwrites(self):
+        """Test record mode calls the model even when a cassette exists."""
+        self.record("What is 2 + 2?", "The answer is 4")
+        with use_cassette(self.path, mode=RECORD) as recorder:
+            recorder.inner = FakeTransport("It is four")
+            DeepSeekLLM(model_version="small")._complete("What is 2 + 2?")
+
+        with use_cassette(self.path, mode=REPLAY):
+            text, _ = DeepSeekLLM(model_version="small")._complete("What is 2 + 2?")
+        self.assertEqual(text, "It is four")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the resident agent daemon and its thin client
+"""
+import logging
+import os
+import shutil
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import main
+from src import agent
+from src.agent import create_agent
+from src.daemon import DaemonUnavailable, query_daemon
+from src.daemon.server import AgentDaemon
+from tests.fakes import FakeTransport
+
+ANSWER = '{"action": "Final Answer", "action_input": "Paris is the capital of France."}'
+
+
+class TestDaemon(unittest.TestCase):
+    """Tests for serving queries from a resident process over a Unix socket."""
+
+    def setUp(self):
+        # Short path: Unix socket paths are limited to about 100 characters
+        self.directory = tempfile.mkdtemp(dir="/tmp")
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.socket_path = os.path.join(self.directory, "agent.sock")
+
+        FakeTransport(ANSWER, chunk_size=8).install(self)
+
+    def start_daemon(self):
+        server = AgentDaemon(self.socket_path, models=["small"])
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.addCleanup(stop)
+        return server
+
+    def test_query_streams_tokens_and_returns_the_answer(self):
+        """Test the client streams the model's tokens and gets the final answer."""
+        self.start_daemon()
+        tokens = []
+        response = query_daemon("What is the capital of France?", on_token=tokens.append,
+                                socket_path=self.socket_path)
+
+        self.assertEqual(response, "Paris is the capital of France.")
+        self.assertEqual("".join(tokens).strip(), ANSWER)
+
+    def test_socket_is_private_and_log_has_no_query_text(self):
+        """Test the socket is only accessible to its user and queries aren't logged verbatim."""
+        self.start_daemon()
+        self.assertEqual(stat.S_IMODE(os.stat(self.socket_path).st_mode), 0o600)
+
+        with self.assertLogs("src.daemon.server", logging.INFO) as logs:
+            query_daemon("What is the capital of France?", socket_path=self.socket_path)
+        self.assertTrue(logs.records)
+        self.assertNotIn("capital", "\n".join(logs.output))
+
+    def test_serve_logs_warnings_by_default(self):
+        """Test --serve only logs warnings unless --verbose is given."""
+        for flags, level in (([], logging.WARNING), (["--verbose"], logging.DEBUG)):
+            with self.subTest(flags=flags), \
+                    mock.patch.object(sys, "argv", ["main.py", "--serve"] + flags), \
+                    mock.patch("src.log.configure_logging") as configure_logging, \
+                    mock.patch("src.daemon.server.serve"):
+                self.assertEqual(main.main(), 0)
+            self.assertEqual(configure_logging.call_args[0][0], level)
+
+    def test_queries_reuse_the_agent(self):
+        """Test the daemon builds one agent per model set and reuses it."""
+        self.start_daemon()
+        for _ in range(2):
+            query_daemon("What is the capital of France?", socket_path=self.socket_path)
+
+        self.assertEqual(len(agent._agent_cache), 1)
+        self.assertIs(create_agent(models=["small"]), create_agent(models=["small"]))
+        self.assertIsNot(create_agent(models=["large"]), create_agent(models=["small"]))
+
+    def test_no_daemon(self):
+        """Test the client reports a missing daemon, including a stale socket file."""
+        with self.assertRaises(DaemonUnavailable):
+            query_daemon("Hello", socket_path=self.socket_path)
+
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+        with self.assertRaises(DaemonUnavailable):
+            query_daemon("Hello", socket_path=self.socket_path)
+
+        # A new daemon replaces the stale socket but not a live one
+        self.start_daemon()
+        with self.assertRaises(RuntimeError):
+            AgentDaemon(self.socket_path)
+
+    def test_main_falls_back_to_in_process(self):
+        """Test main.py answers in-process when no daemon is running."""
+        argv = ["main.py", "--quiet", "--socket", self.socket_path, "Hello"]
+        with mock.patch.object(sys, "argv", argv), \
+                mock.patch.object(main, "run_in_process", return_value="Hi") as run_in_process, \
+                mock.patch("builtins.print") as printed:
+            self.assertEqual(main.main(), 0)
+        run_in_process.assert_called_once()
+        printed.assert_called_with("Hi")
+
+    def test_main_uses_the_daemon(self):
+        """Test main.py hands the query to a running daemon."""
+        self.start_daemon()
+        argv = ["main.py", "--quiet", "--socket", self.socket_path,
+                "What is the capital of France?"]
+        with mock.patch.object(sys, "argv", argv), \
+                mock.patch.object(main, "run_in_process") as run_in_process, \
+                mock.patch("builtins.print") as printed:
+            self.assertEqual(main.main(), 0)
+        run_in_process.assert_not_called()
+        printed.assert_called_with("Paris is the capital of France.")
+
+
+if __name__ == "__main__":
+    unittest.main()
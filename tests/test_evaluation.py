@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Unit tests for typed expectations and the evaluation matrix
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from src.agent import DeepSeekLLM
+from tests.fakes import FakeTransport
+from utils import benchmark
+from utils.benchmark import (mark_pareto, parse_generation_config, record_matrix, run_matrix,
+                             select_cheapest)
+from utils.benchmark_history import find_run, load_runs
+from utils.expectations import as_case, check_case, expected_value, load_cases
+
+
+def make_cell(label, accuracy, p50, p99, tokens, cost=0.0):
+    """Build the parts of a matrix cell that selection looks at."""
+    return {"label": label, "accuracy": accuracy, "average_tokens": tokens, "cost": cost,
+            "latency": {"p50": p50, "p99": p99}}
+
+
+class TestEvaluation(unittest.TestCase):
+    """Tests for expected-answer checks and picking a matrix cell."""
+
+    def test_numeric_expectation_uses_the_computation_tool(self):
+        """Test numeric checks compare against the tool's own result."""
+        self.assertEqual(expected_value("2^8"), 256)
+        case = as_case({"question": "Calculate 1000 * 1000",
+                        "expect": [{"type": "numeric", "expression": "1000 * 1000"}]})
+        self.assertTrue(check_case(case, "That is 1,000,000.")["success"])
+        self.assertFalse(check_case(case, "That is 100,000.")["success"])
+
+        with self.assertRaises(ValueError):
+            as_case({"question": "Broken", "expect": [{"type": "numeric", "expression": "1 +"}]})
+
+    def test_keyword_and_tool_expectations(self):
+        """Test keyword checks are case-insensitive and tool checks use the routing."""
+        case = as_case({"question": "What is the capital of France?",
+                        "expect": [{"type": "keywords", "any": ["Paris"]},
+                                   {"type": "tool", "tool": None}]})
+        self.assertTrue(check_case(case, "It's paris.")["success"])
+        result = check_case(case, "It's Paris.", tools_used=["custom_computation"])
+        self.assertFalse(result["success"])
+        self.assertEqual([check["passed"] for check in result["checks"]], [True, False])
+
+        every = as_case({"question": "q", "expect": [{"type": "keywords", "all": ["a", "b"]}]})
+        self.assertFalse(check_case(every, "only a")["success"])
+
+    def test_plain_questions_use_the_heuristic(self):
+        """Test plain questions keep the old success heuristic."""
+        case = as_case("Calculate 2 + 2")
+        self.assertIsNone(case["expect"])
+        self.assertTrue(check_case(case, "The result is 4.")["success"])
+        self.assertFalse(check_case(case, "Four")["success"])
+
+    def test_load_cases(self):
+        """Test cases load from .jsonl files and plain questions from text files."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        typed = os.path.join(directory, "cases.jsonl")
+        with open(typed, "w") as f:
+            f.write(json.dumps({"question": "Calculate 3 * 3",
+                                "expect": [{"type": "numeric", "expression": "3 * 3"}]}) + "\n")
+        plain = os.path.join(directory, "questions.txt")
+        with open(plain, "w") as f:
+            f.write("What is AI?\n\n")
+
+        self.assertEqual(load_cases(typed)[0]["expect"][0]["expression"], "3 * 3")
+        self.assertEqual(load_cases(plain), [{"question": "What is AI?", "expect": None}])
+
+    def test_pareto_front_and_cheapest_cell(self):
+        """Test dominated cells are off the front and the cheapest SLO-meeting cell wins."""
+        cells = [
+            make_cell("small", 0.7, 1.0, 2.0, 300),
+            make_cell("medium", 0.9, 2.0, 4.0, 500),
+            make_cell("large", 0.9, 3.0, 8.0, 600),
+            make_cell("slow-small", 0.7, 1.5, 2.5, 300),
+        ]
+        mark_pareto(cells)
+        self.assertEqual([cell["label"] for cell in cells if cell["pareto"]], ["small", "medium"])
+
+        self.assertEqual(select_cheapest(cells, min_accuracy=0.8)["label"], "medium")
+        self.assertEqual(select_cheapest(cells, slo_p99=3.0)["label"], "small")
+        self.assertIsNone(select_cheapest(cells, slo_p99=3.0, min_accuracy=0.8))
+
+    def test_generation_options_reach_the_model(self):
+        """Test generation options are sent to Ollama and configs parse from the CLI."""
+        transport = FakeTransport("ok")
+        DeepSeekLLM(model_version="small", options={"temperature": 0},
+                    transport=transport)._complete("Hi")
+        self.assertEqual(transport.payloads[0]["options"], {"temperature": 0})
+
+        name, settings = parse_generation_config('greedy={"temperature": 0, "tool_top_k": 1}')
+        self.assertEqual(name, "greedy")
+        self.assertEqual(settings, {"tool_top_k": 1, "options": {"temperature": 0}})
+
+    def test_run_matrix(self):
+        """Test every model/config cell runs every case and is scored."""
+        calls = []
+
+        def fake_run_agent(query, models=None, options=None, **kwargs):
+            calls.append((tuple(models), options))
+            return "It is Paris." if models == ["large"] else "No idea."
+
+        cases = [{"question": "What is the capital of France?",
+                  "expect": [{"type": "keywords", "any": ["Paris"]}]}]
+        with mock.patch.object(benchmark, "run_agent", fake_run_agent), \
+                mock.patch("builtins.print"):
+            matrix = run_matrix(questions=cases, model_sets=[["small"], ["large"]],
+                                generation_configs={"default": {},
+                                                    "greedy": {"options": {"temperature": 0}}},
+                                parallel=2, min_accuracy=1.0)
+
+        self.assertEqual(len(calls), 4)
+        self.assertIn((("large",), {"temperature": 0}), calls)
+        accuracy = {cell["label"]: cell["accuracy"] for cell in matrix["cells"]}
+        self.assertEqual(accuracy, {"small / default": 0.0, "small / greedy": 0.0,
+                                    "large / default": 1.0, "large / greedy": 1.0})
+        self.assertIn(matrix["choice"], ("large / default", "large / greedy"))
+
+        # Each cell is recorded under its own label
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        history_file = os.path.join(directory, "history.jsonl")
+        record_matrix(matrix, history_file, label="baseline")
+        self.assertEqual([run["label"] for run in load_runs(history_file)],
+                         ["baseline (small / default)", "baseline (small / greedy)",
+                          "baseline (large / default)", "baseline (large / greedy)"])
+        self.assertEqual(find_run(load_runs(history_file), "baseline (large / greedy)")["models"],
+                         ["large"])
+
+
+if __name__ == "__main__":
+    unittest.main()
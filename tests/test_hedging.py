@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Unit tests for query routing and hedged execution
+"""
+import time
+import unittest
+from unittest import mock
+from src import agent
+from src.agent import route_query, run_agent
+
+
+class FakeExecutor:
+    """Stands in for the AgentExecutor with a fixed delay and output.
+
+    An exception as the output is raised instead of returned.
+    """
+
+    def __init__(self, output, delay, cancel_event=None):
+        self.output = output
+        self.delay = delay
+        self.cancel_event = cancel_event
+
+    def invoke(self, inputs, config=None):
+        if self.cancel_event is not None and self.cancel_event.wait(self.delay):
+            raise agent.RequestCancelled("cancelled")
+        if isinstance(self.output, Exception):
+            raise self.output
+        return {"output": self.output}
+
+
+class TestHedging(unittest.TestCase):
+    """Tests for routing and the hedged agent/direct-answer race, with both paths faked."""
+
+    def patch_paths(self, agent_output, agent_delay, direct_output, direct_delay):
+        """Replace both execution paths and record cancellation events."""
+        self.cancel_events = {}
+
+        def fake_create_agent(max_iterations=3, constrained_output=False, cancel_event=None,
+                              **kwargs):
+            self.cancel_events["agent"] = cancel_event
+            return FakeExecutor(agent_output, agent_delay, cancel_event)
+
+        def fake_direct(query, constrained_output=False, callbacks=None, cancel_event=None,
+                        *args, **kwargs):
+            self.cancel_events["direct"] = cancel_event
+            if cancel_event.wait(direct_delay):
+                raise agent.RequestCancelled("cancelled")
+            return direct_output
+
+        patches = [
+            mock.patch.object(agent, "create_agent", fake_create_agent),
+            mock.patch.object(agent, "run_direct_answer", fake_direct),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_route_query(self):
+        """Test tool signals are routed to tools and the rest is unsure."""
+        self.assertEqual(route_query("What is 5 + 7?"), "tool")
+        self.assertEqual(route_query("Calculate 2^8"), "tool")
+        self.assertEqual(route_query(
+            "What's the weather on the moon at latitude 25?"), "tool")
+        self.assertEqual(route_query("What is the capital of France?"), "unsure")
+
+    def test_fast_agent_skips_direct_path(self):
+        """Test the direct path never starts when the agent beats the delay."""
+        self.patch_paths("Paris", 0.0, "direct", 0.0)
+        response = run_agent("What is the capital of France?",
+                             hedge=True, hedge_delay=0.5)
+        self.assertEqual(response, "Paris")
+        self.assertNotIn("direct", self.cancel_events)
+
+    def test_direct_path_wins_and_cancels_agent(self):
+        """Test a slow agent loses to the direct path and is cancelled."""
+        self.patch_paths("slow", 5.0, "Paris", 0.0)
+        start = time.time()
+        response = run_agent("What is the capital of France?",
+                             hedge=True, hedge_delay=0.05)
+        self.assertEqual(response, "Paris")
+        self.assertLess(time.time() - start, 2.0)
+        self.assertTrue(self.cancel_events["agent"].is_set())
+
+    def test_iteration_limit_is_not_a_valid_answer(self):
+        """Test an agent that hits the iteration limit defers to the direct path."""
+        self.patch_paths(agent.ITERATION_LIMIT_OUTPUT + " or time limit.", 0.1,
+                         "Paris", 0.3)
+        response = run_agent("What is the capital of France?",
+                             hedge=True, hedge_delay=0.01)
+        self.assertEqual(response, "Paris")
+
+    def test_agent_failing_before_the_delay_starts_direct_path(self):
+        """Test an agent that fails fast falls back at once instead of erroring."""
+        for agent_output in (ValueError("model unreachable"),
+                             agent.ITERATION_LIMIT_OUTPUT + " or time limit."):
+            with self.subTest(agent_output=agent_output):
+                self.patch_paths(agent_output, 0.0, "Paris", 0.0)
+                start = time.time()
+                response = run_agent("What is the capital of France?",
+                                     hedge=True, hedge_delay=2.0)
+                self.assertEqual(response, "Paris")
+                self.assertIn("direct", self.cancel_events)
+                self.assertLess(time.time() - start, 1.0)
+
+    def test_tool_queries_are_not_hedged(self):
+        """Test queries routed to a tool run the agent alone."""
+        self.patch_paths("The result is 12.", 0.2, "direct", 0.0)
+        response = run_agent("What is 5 + 7?", hedge=True, hedge_delay=0.01)
+        self.assertEqual(response, "The result is 12.")
+        self.assertNotIn("direct", self.cancel_events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the leveled, queue-backed logging pipeline
+"""
+import io
+import json
+import logging
+import unittest
+from unittest import mock
+from src.agent import DeepSeekLLM
+from src.log import configure_logging, shutdown_logging
+from tests.fakes import FakeTransport
+
+ANSWER = '{"action": "Final Answer", "action_input": "4"}'
+
+
+class TestLogging(unittest.TestCase):
+    """Tests for log configuration and token streaming."""
+
+    def setUp(self):
+        self.stderr = io.StringIO()
+        self.stdout = io.StringIO()
+        FakeTransport(ANSWER, chunk_size=16).install(self)
+        self.addCleanup(configure_logging, logging.WARNING)
+
+    def configure(self, **kwargs):
+        with mock.patch("sys.stdout", self.stdout):
+            configure_logging(stream=self.stderr, **kwargs)
+
+    def test_queued_records_are_flushed(self):
+        """Test records handed to the listener thread reach the stream."""
+        self.configure(level=logging.INFO)
+        logging.getLogger("src.agent").info("queued message")
+        shutdown_logging()
+        self.assertIn("queued message", self.stderr.getvalue())
+
+    def test_json_format_includes_extra_fields(self):
+        """Test JSON lines carry the record's structured fields."""
+        self.configure(level=logging.INFO, json_format=True, queued=False)
+        logging.getLogger("src.agent").info("Selected tools", extra={"event": "tool_selection"})
+        entry = json.loads(self.stderr.getvalue().splitlines()[0])
+        self.assertEqual(entry["message"], "Selected tools")
+        self.assertEqual(entry["event"], "tool_selection")
+        self.assertEqual(entry["level"], "INFO")
+
+    def test_tokens_not_written_by_default(self):
+        """Test streamed tokens produce no output unless switched on."""
+        self.configure(level=logging.DEBUG, queued=False)
+        text = DeepSeekLLM()._call("What is 2 + 2?")
+        self.assertEqual(text, ANSWER)
+        self.assertEqual(self.stdout.getvalue(), "")
+        self.assertIn("Calling", self.stderr.getvalue())
+
+    def test_tokens_streamed_when_enabled(self):
+        """Test streamed tokens are echoed to stdout without extra newlines."""
+        self.configure(level=logging.WARNING, stream_tokens=True, queued=False)
+        DeepSeekLLM()._call("What is 2 + 2?")
+        self.assertEqual(self.stdout.getvalue(), ANSWER + "\n")
+        self.assertEqual(self.stderr.getvalue(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
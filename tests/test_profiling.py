@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the per-stage agent profiler
+"""
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from unittest import mock
+from src.agent import run_agent
+from tests.fakes import FakeTransport
+from utils import benchmark
+from utils.profiling import AgentProfiler
+
+
+class TestProfiling(unittest.TestCase):
+    """Tests for the profile files written for an agent run."""
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+        FakeTransport([
+            '{"action": "custom_computation", "action_input": "12 * 2"}',
+            '{"action": "Final Answer", "action_input": "24"}',
+        ]).install(self)
+
+    def test_profile_is_split_by_stage(self):
+        """Test a run produces pstats per stage, collapsed stacks and allocations."""
+        with AgentProfiler(self.output_dir, "calc", sample_interval=0.001) as profiler:
+            run_agent("Calculate 12 * 2", callbacks=[profiler.callback])
+
+        files = set(os.listdir(profiler.output_dir))
+        for stage in ("setup", "agent", "llm", "tool"):
+            self.assertIn(f"{stage}.pstats", files)
+            self.assertIn(stage, profiler.summary["stages"])
+        self.assertTrue({"all.pstats", "stacks.collapsed", "allocations.txt",
+                         "allocations.snapshot", "summary.json"} <= files)
+
+        # The files load with the standard tools
+        pstats.Stats(os.path.join(profiler.output_dir, "all.pstats"))
+        with open(os.path.join(profiler.output_dir, "stacks.collapsed")) as f:
+            for line in f:
+                stack, count = line.rsplit(" ", 1)
+                self.assertIn(stack.split(";", 1)[0], profiler.summary["stages"])
+                self.assertGreater(int(count), 0)
+
+    def test_other_threads_cpu_is_not_charged_to_a_stage(self):
+        """Test a stage blocked while another thread burns CPU shows little CPU time."""
+        stop = threading.Event()
+
+        def spin():
+            while not stop.is_set():
+                pass
+
+        spinner = threading.Thread(target=spin, daemon=True)
+        spinner.start()
+        self.addCleanup(spinner.join)
+        self.addCleanup(stop.set)
+
+        with AgentProfiler(self.output_dir, "blocked") as profiler:
+            profiler.push_stage("llm")
+            time.sleep(0.5)
+            profiler.pop_stage()
+
+        self.assertLess(profiler.summary["stages"]["llm"]["cpu_seconds"], 0.1)
+
+    def test_benchmark_stops_profiler_on_failure(self):
+        """Test a failed benchmark query still stops the sampler and tracemalloc."""
+        with mock.patch.object(benchmark, "run_agent", side_effect=RuntimeError("boom")), \
+                mock.patch("builtins.print"):
+            with self.assertRaises(RuntimeError):
+                benchmark.run_benchmark(questions=["Hello"], profile_dir=self.output_dir)
+
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertNotIn("profiler-sampler", [thread.name for thread in threading.enumerate()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for multi-turn agent sessions
+"""
+import unittest
+from unittest import mock
+from src import session as session_module
+from src.session import AgentSession, InMemorySessionStore, get_session
+
+
+class TestAgentSession(unittest.TestCase):
+    """Tests for bounded session history, compaction and session stores."""
+
+    def setUp(self):
+        self.history_seen = []
+
+        def fake_run_agent(query, chat_history=None, callbacks=None, **kwargs):
+            self.history_seen.append(chat_history)
+            return f"Answer to: {query} " + "x" * 200
+
+        patch = mock.patch.object(session_module, "run_agent", fake_run_agent)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.summary_calls = []
+
+        def fake_summarizer(summary, messages):
+            self.summary_calls.append(len(messages))
+            return (summary + " | " if summary else "") + f"{len(messages)} messages"
+
+        self.summarizer = fake_summarizer
+
+    def test_history_is_passed_to_later_turns(self):
+        """Test each turn sees the previous turns as history."""
+        session = AgentSession(summarizer=self.summarizer)
+        session.run("Calculate 5 + 7.")
+        session.run("Multiply the result by 2.")
+
+        self.assertEqual(self.history_seen[0], [])
+        self.assertEqual(self.history_seen[1][0].content, "Calculate 5 + 7.")
+        self.assertEqual(len(session.state["messages"]), 4)
+
+    def test_history_stays_within_budget(self):
+        """Test old turns are compacted so the prompt history stays bounded."""
+        session = AgentSession(history_token_budget=300, summary_token_budget=50,
+                               summarizer=self.summarizer)
+        for i in range(10):
+            session.run(f"Question {i}")
+            self.assertLessEqual(session.history_tokens(), 300 + 60)
+
+        self.assertTrue(session.summary)
+        self.assertEqual(self.history_seen[-1][0].type, "system")
+        self.assertEqual(len(session.state["messages"]), 20)
+
+    def test_compaction_is_incremental(self):
+        """Test each compaction only summarizes newly evicted turns."""
+        session = AgentSession(history_token_budget=300, summary_token_budget=50,
+                               summarizer=self.summarizer)
+        for i in range(10):
+            session.run(f"Question {i}")
+
+        # Every message is summarized at most once
+        self.assertLessEqual(sum(self.summary_calls), 20)
+        self.assertEqual(sum(self.summary_calls), session.window_start)
+
+    def test_over_budget_summary_is_condensed_then_trimmed(self):
+        """Test an over-budget summary is re-summarized, then trimmed on sentence boundaries."""
+        calls = []
+
+        def verbose_summarizer(summary, messages):
+            calls.append(len(messages))
+            return " ".join(f"Fact number {i} was noted." for i in range(100))
+
+        session = AgentSession(history_token_budget=300, summary_token_budget=50,
+                               summarizer=verbose_summarizer)
+        for i in range(10):
+            session.run(f"Question {i}")
+
+        # Each compaction asks once more for a tighter summary
+        self.assertIn(0, calls)
+        self.assertLessEqual(len(session.summary), 50 * 4)
+        self.assertTrue(session.summary.startswith("Fact number"))
+        self.assertTrue(session.summary.endswith("Fact number 99 was noted."))
+
+    def test_store_evicts_least_recently_used(self):
+        """Test the in-memory store evicts the least recently used session."""
+        store = InMemorySessionStore(max_sessions=2, ttl_seconds=None)
+        first = get_session("a", store=store, summarizer=self.summarizer)
+        get_session("b", store=store, summarizer=self.summarizer)
+        self.assertIs(get_session("a", store=store), first)
+
+        get_session("c", store=store, summarizer=self.summarizer)
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get("b"))
+        self.assertIs(store.get("a"), first)
+
+    def test_store_evicts_idle_sessions(self):
+        """Test sessions idle for longer than the TTL are evicted."""
+        store = InMemorySessionStore(ttl_seconds=60)
+        session = get_session("idle", store=store, summarizer=self.summarizer)
+        session.last_active -= 120
+        self.assertIsNone(store.get("idle"))
+
+
+if __name__ == "__main__":
+    unittest.main()
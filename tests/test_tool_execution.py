@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit tests for isolated, time-limited tool execution
+"""
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from langchain_core.tools import tool
+from src.tools import custom_computation, execution
+from src.tools.computation.tool import POLICY as COMPUTATION_POLICY
+from src.tools.execution import (BUSY, MEMORY_LIMIT, PROCESS, THREAD, TIMEOUT, ToolExecutor,
+                                 ToolPolicy, get_tool_executor)
+
+release = threading.Event()
+
+
+@tool("slow_lookup")
+def slow_lookup(query: str) -> str:
+    """Wait until the test releases the call."""
+    release.wait(5)
+    return f"Found {query}"
+
+
+class TestToolExecution(unittest.TestCase):
+    """Tests for dispatching tool calls to thread pools and worker processes."""
+
+    def setUp(self):
+        release.clear()
+
+    def make_executor(self, **policies):
+        executor = ToolExecutor(policies)
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(release.set)
+        return executor
+
+    def test_process_tool_returns_result(self):
+        """Test a process tool runs in a warm worker, with string or dict input."""
+        executor = self.make_executor(custom_computation=ToolPolicy(
+            executor=PROCESS, timeout=5.0, max_concurrency=1, warm_workers=1))
+        wrapped = executor.wrap(custom_computation)
+        self.assertEqual(wrapped.name, "custom_computation")
+        self.assertEqual(wrapped.run("6 * 7"), "The result is 42.")
+        self.assertEqual(wrapped.run({"query": "2^8"}), "The result is 256.")
+
+    def test_process_tool_timeout_is_observation(self):
+        """Test a runaway computation is killed and reported as a timeout."""
+        executor = self.make_executor(custom_computation=ToolPolicy(
+            executor=PROCESS, timeout=1.0, max_concurrency=1, warm_workers=1))
+        wrapped = executor.wrap(custom_computation)
+        # Worker startup doesn't count against the timeout, so keep it out
+        # of the measured time as well
+        self.assertEqual(wrapped.run("1 + 2"), "The result is 3.")
+
+        start_time = time.time()
+        observation = json.loads(wrapped.run("9**9**9"))
+        self.assertLess(time.time() - start_time, 3.0)
+        self.assertEqual(observation["error"], TIMEOUT)
+        self.assertEqual(observation["tool"], "custom_computation")
+        self.assertEqual(observation["timeout_seconds"], 1.0)
+
+        # The killed worker is replaced, so later calls still work
+        self.assertEqual(wrapped.run("1 + 1"), "The result is 2.")
+
+    def test_process_tool_memory_limit_is_observation(self):
+        """Test a computation over its memory limit is reported as such."""
+        executor = self.make_executor(custom_computation=COMPUTATION_POLICY)
+        wrapped = executor.wrap(custom_computation)
+
+        observation = json.loads(wrapped.run("[0] * 10**9"))
+        self.assertEqual(observation["error"], MEMORY_LIMIT)
+        self.assertEqual(observation["memory_limit_mb"], COMPUTATION_POLICY.memory_limit_mb)
+
+        # The worker survives a MemoryError and keeps serving calls
+        self.assertEqual(wrapped.run("1 + 1"), "The result is 2.")
+
+    def test_thread_tool_timeout_is_observation(self):
+        """Test a thread tool that overruns returns a timeout observation."""
+        executor = self.make_executor(slow_lookup=ToolPolicy(
+            executor=THREAD, timeout=0.2, max_concurrency=1))
+        observation = json.loads(executor.wrap(slow_lookup).run("moon"))
+        self.assertEqual(observation["error"], TIMEOUT)
+
+    def test_concurrency_limit(self):
+        """Test calls beyond a tool's concurrency limit are turned away."""
+        executor = self.make_executor(slow_lookup=ToolPolicy(
+            executor=THREAD, timeout=0.5, max_concurrency=1))
+        wrapped = executor.wrap(slow_lookup)
+
+        first = threading.Thread(target=wrapped.run, args=("first",))
+        first.start()
+        time.sleep(0.05)
+        observation = json.loads(wrapped.run("second"))
+        self.assertEqual(observation["error"], BUSY)
+        self.assertEqual(observation["max_concurrency"], 1)
+
+        release.set()
+        first.join()
+        self.assertEqual(wrapped.run("third"), "Found third")
+
+    def test_warm_workers_start_in_the_background(self):
+        """Test creating an executor doesn't wait for its warm workers to start."""
+        def slow_worker(memory_limit_mb):
+            time.sleep(0.5)
+            return mock.Mock()
+
+        with mock.patch.object(execution, "_ProcessWorker", side_effect=slow_worker):
+            start_time = time.time()
+            executor = self.make_executor(custom_computation=ToolPolicy(
+                executor=PROCESS, warm_workers=1))
+            self.assertLess(time.time() - start_time, 0.25)
+
+            pool = executor._processes["custom_computation"]
+            pool._warmer.join()
+            self.assertEqual(len(pool._idle), 1)
+
+    def test_shared_executor_is_created_once(self):
+        """Test concurrent first calls to get_tool_executor share one executor."""
+        def slow_executor(policies):
+            time.sleep(0.1)
+            return mock.Mock()
+
+        executors = []
+        with mock.patch.object(execution, "_executor", None), \
+                mock.patch.object(execution, "ToolExecutor", side_effect=slow_executor) as created:
+            threads = [threading.Thread(target=lambda: executors.append(get_tool_executor()))
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(created.call_count, 1)
+        self.assertEqual(len({id(executor) for executor in executors}), 1)
+
+    def test_failed_submit_releases_its_slot(self):
+        """Test a call that can't be submitted doesn't keep its concurrency slot."""
+        executor = self.make_executor(slow_lookup=ToolPolicy(
+            executor=THREAD, timeout=0.2, max_concurrency=1))
+        stopped = ThreadPoolExecutor()
+        stopped.shutdown()
+
+        with mock.patch.object(executor, "_thread_pool", return_value=stopped):
+            with self.assertRaises(RuntimeError):
+                executor.run(slow_lookup, {"query": "moon"})
+
+        release.set()
+        self.assertEqual(executor.wrap(slow_lookup).run("moon"), "Found moon")
+
+
+if __name__ == "__main__":
+    unittest.main()
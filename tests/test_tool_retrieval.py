@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Unit tests for relevance-based tool selection
+"""
+import unittest
+from src.agent import estimate_system_prompt_tokens
+from src.tools import get_all_tools, get_combined_prompt_template, select_tools
+from src.tools.retrieval import ToolIndex, tokenize
+
+
+class TestToolRetrieval(unittest.TestCase):
+    """Tests for the tool index and per-query tool selection."""
+
+    def test_tokenize(self):
+        """Test stop words are dropped, words stemmed and expressions tagged."""
+        self.assertEqual(tokenize("What is the calculation of 5 + 7?"),
+                         ["#expr", "calcul", "#num", "#num"])
+
+    def test_index_ranks_matching_document_first(self):
+        """Test the document sharing the query's terms scores highest."""
+        index = ToolIndex({
+            "weather": "Weather forecast for a city",
+            "stocks": "Stock prices for a ticker symbol",
+        })
+        self.assertEqual(index.select("forecast the weather in Paris"), ["weather"])
+        self.assertEqual(index.select("tell me a joke"), [])
+
+    def test_selects_relevant_tool(self):
+        """Test calculation and moon weather queries get only their tool."""
+        names = [tool.name for tool in select_tools("Calculate 42 * 13")]
+        self.assertEqual(names, ["custom_computation"])
+
+        names = [tool.name for tool in select_tools(
+            "What's the weather on the moon at latitude 25.0, longitude 45.0?")]
+        self.assertEqual(names, ["moon_weather"])
+
+    def test_falls_back_to_all_tools(self):
+        """Test queries matching no tool keep every tool available."""
+        self.assertEqual(select_tools("What is the capital of France?"),
+                         get_all_tools())
+
+    def test_selection_shrinks_system_prompt(self):
+        """Test the system prompt only carries the selected tools' instructions."""
+        prompt = get_combined_prompt_template(["custom_computation"])
+        self.assertIn("custom_computation", prompt)
+        self.assertNotIn("moon_weather", prompt)
+
+        selected = select_tools("Calculate 42 * 13")
+        self.assertLess(estimate_system_prompt_tokens(selected),
+                        estimate_system_prompt_tokens(get_all_tools()))
+
+
+if __name__ == "__main__":
+    unittest.main()
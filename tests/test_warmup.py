@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for model warm-up and residency management
+"""
+import unittest
+from unittest import mock
+from src.agent import DeepSeekLLM
+from src.llm import transport, warmup
+from src.llm.warmup import DEFAULT_KEEP_ALIVE, ResidencyManager, warm_up
+from utils import benchmark
+
+
+class FakeResponse:
+    """Minimal stand-in for a requests response."""
+
+    def __init__(self, payload=None):
+        self.payload = payload or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+    def iter_lines(self):
+        yield b'{"message": {"content": "Hi"}}'
+
+    def close(self):
+        pass
+
+
+class TestWarmup(unittest.TestCase):
+    """Tests for warm-up reporting and keeping models resident."""
+
+    def setUp(self):
+        self.resident = []
+        self.posts = []
+
+        def get(url, timeout=None):
+            return FakeResponse({"models": [{"name": name} for name in self.resident]})
+
+        def post(url, json=None, stream=None, timeout=None):
+            self.posts.append((url.rsplit("/", 1)[-1], json))
+            return FakeResponse()
+
+        session = mock.Mock(get=get, post=post)
+        patch = mock.patch.object(warmup, "get_session", return_value=session)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_warm_up_primes_system_prompt(self):
+        """Test warm-up sends the agent's system prompt with keep_alive."""
+        self.resident = ["small"]
+        report = warm_up(["small", "large"], keep_alive="10m")
+
+        self.assertTrue(report["small"]["was_resident"])
+        self.assertFalse(report["large"]["was_resident"])
+        self.assertIn("cold_first_token", report["large"])
+
+        endpoint, payload = self.posts[0]
+        self.assertEqual(endpoint, "chat")
+        self.assertEqual(payload["keep_alive"], "10m")
+        self.assertTrue(payload["messages"][0]["content"].startswith(
+            "System: \nYou are a helpful AI assistant"))
+
+    def test_residency_manager_reloads_unloaded_models(self):
+        """Test a refresh reloads missing models and refreshes the others."""
+        self.resident = ["small"]
+        manager = ResidencyManager(["small", "large"], keep_alive=-1)
+        manager.refresh()
+
+        self.assertEqual(manager.reloads, 1)
+        self.assertEqual([payload["model"] for _, payload in self.posts],
+                         ["small", "large"])
+        self.assertTrue(all(payload["keep_alive"] == -1 for _, payload in self.posts))
+
+    def test_ollama_requests_share_one_session(self):
+        """Test chat requests and warm-up calls reuse the same pooled connections."""
+        self.assertIs(transport.OllamaTransport().session, transport.get_session())
+        self.assertIs(transport.get_session(), transport.get_session())
+
+    def test_queries_keep_the_model_resident(self):
+        """Test agent requests send the same keep_alive the warm-up uses."""
+        transport = mock.Mock()
+        transport.stream_chat.return_value = iter([b'{"message": {"content": "Hi"}}'])
+        DeepSeekLLM(model_version="small", transport=transport)._complete("Hi")
+
+        payload = transport.stream_chat.call_args[0][0]
+        self.assertEqual(payload["keep_alive"], DEFAULT_KEEP_ALIVE)
+
+    def test_benchmark_stops_residency_on_failure(self):
+        """Test a benchmark run that fails midway still stops the refresh thread."""
+        manager = ResidencyManager(["small"], interval=3600)
+        with mock.patch.object(benchmark, "warm_up"), \
+                mock.patch.object(benchmark, "ResidencyManager", return_value=manager), \
+                mock.patch.object(benchmark, "run_agent", side_effect=RuntimeError("boom")), \
+                mock.patch("builtins.print"):
+            with self.assertRaises(RuntimeError):
+                benchmark.run_benchmark(questions=["Hello"], models=["small"], warm=True)
+
+        self.assertTrue(manager._stop.is_set())
+        self.assertIsNone(manager._thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,24 @@
 """
 Benchmark script for DeepSeek R1 LangGraph Agent
 """
-from src.agent import run_agent
+from src.agent import DEFAULT_MODEL, estimate_system_prompt_tokens, route_query, run_agent
+from src.llm.cascade import parse_models
+from src.llm.warmup import ResidencyManager, warm_up
+from src.tools import get_all_tools, select_tools
+from src.llm.tokens import estimate_tokens
+from src.log import configure_logging
+from src.session import AgentSession
+from utils.benchmark_history import DEFAULT_HISTORY_FILE, append_run, check_regression
+from utils.expectations import DEFAULT_CASES, as_case, check_case, load_cases
+from utils.profiling import AgentProfiler, print_profile_summary, slugify
+from utils.stats import percentile
+from langchain_core.callbacks import BaseCallbackHandler
+from concurrent.futures import ThreadPoolExecutor
 import time
 import argparse
 import json
+import logging
+import math
 import sys
 import os
 
@@ -15,92 +29,276 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 
-# Sample questions to test the agent with
-DEFAULT_QUESTIONS = [
-    "What is artificial intelligence?",
-    "Calculate 42 * 13",
-    "What is the capital of France?",
-    "Calculate 5 + (10 * 2)",
-    "Who is the author of 'Pride and Prejudice'?",
-    "Calculate 100 / 4",
-    "What is machine learning?",
-    "Calculate 7 * 8 + 3",
-    "What is the meaning of life?",
-    "Calculate 2^8"
-]
+# Sample questions to test the agent with; DEFAULT_CASES adds their expected answers
+DEFAULT_QUESTIONS = [case["question"] for case in DEFAULT_CASES]
 
 
-def run_benchmark(questions=None, output_file=None, max_iterations=5):
+class IterationCounter(BaseCallbackHandler):
+    """Counts LLM round-trips, parse-error retries, prompt size, tool calls and per-model usage during an agent run."""
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.parse_errors = 0
+        self.prompt_tokens = []
+        self.attempts = []
+        self.tools_used = []
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.llm_calls += 1
+        self.prompt_tokens.append(sum(estimate_tokens(p) for p in prompts))
+
+    def on_llm_end(self, response, **kwargs):
+        for generation in response.generations:
+            info = generation[0].generation_info or {}
+            self.attempts.extend(info.get("attempts", []))
+
+    def on_agent_action(self, action, **kwargs):
+        # handle_parsing_errors turns unparseable output into this pseudo-tool
+        if action.tool == "_Exception":
+            self.parse_errors += 1
+        else:
+            self.tools_used.append(action.tool)
+
+
+def latency_stats(times):
+    """Summarize a list of response times as p50/p95/p99/max."""
+    return {
+        "p50": round(percentile(times, 50), 2),
+        "p95": round(percentile(times, 95), 2),
+        "p99": round(percentile(times, 99), 2),
+        "max": round(max(times), 2) if times else 0.0,
+    }
+
+
+def summarize_model_usage(attempts, model_costs=None):
+    """
+    Aggregate model calls into per-model usage, latency and cost.
+
+    Args:
+        attempts: Attempt records from DeepSeekLLM generation_info
+        model_costs: Optional mapping of model name to cost per 1k tokens
+
+    Returns:
+        Tuple of (per-model usage dict, escalation counts by reason)
+    """
+    model_costs = model_costs or {}
+    usage = {}
+    escalations = {}
+    for attempt in attempts:
+        stats = usage.setdefault(attempt["model"], {
+            "calls": 0, "latency_seconds": 0.0,
+            "prompt_tokens": 0, "completion_tokens": 0,
+        })
+        stats["calls"] += 1
+        stats["latency_seconds"] += attempt["latency"]
+        stats["prompt_tokens"] += attempt.get("prompt_tokens", 0)
+        stats["completion_tokens"] += attempt.get("completion_tokens", 0)
+
+        reason = attempt.get("escalation_reason")
+        if reason:
+            escalations[reason] = escalations.get(reason, 0) + 1
+
+    for model, stats in usage.items():
+        tokens = stats["prompt_tokens"] + stats["completion_tokens"]
+        stats["latency_seconds"] = round(stats["latency_seconds"], 2)
+        stats["average_latency"] = round(stats["latency_seconds"] / stats["calls"], 2)
+        stats["cost"] = round(tokens / 1000 * model_costs.get(model, 0.0), 4)
+
+    return usage, escalations
+
+
+def run_benchmark(questions=None, output_file=None, max_iterations=5,
+                  constrained_output=False, hedge=False, hedge_delay=2.0,
+                  session=False, history_token_budget=1024, tool_top_k=None,
+                  models=None, model_costs=None, warm=False, profile_dir=None):
     """
     Run benchmark tests on the agent with a set of questions.
 
     Args:
-        questions: List of questions to test with
+        questions: List of questions or typed cases (see utils/expectations.py)
+            to test with
         output_file: File to save results to (JSON format)
         max_iterations: Maximum number of iterations for each agent run
+        constrained_output: Request schema-constrained JSON from the model
+        hedge: Race the direct-answer path against the agent for unsure queries
+        hedge_delay: Seconds before the hedged direct-answer path starts
+        session: Run the questions as consecutive turns of one session
+        history_token_budget: Token budget for session history
+        tool_top_k: Only give the agent the k most relevant tools per question
+        models: Model cascade to run, cheapest first
+        model_costs: Mapping of model name to cost per 1k tokens
+        warm: Warm up the models first and keep them resident during the run
+        profile_dir: Profile each question separately into this directory
 
     Returns:
         Dictionary with benchmark results
     """
-    if questions is None:
-        questions = DEFAULT_QUESTIONS
+    cases = [as_case(q) for q in (DEFAULT_CASES if questions is None else questions)]
+    questions = [case["question"] for case in cases]
 
     results = []
     total_time = 0
 
     print(f"Running benchmark with {len(questions)} questions...")
 
-    for i, question in enumerate(questions, 1):
-        print(f"\n[{i}/{len(questions)}] Testing: {question}")
-        start_time = time.time()
-
-        response = run_agent(question, max_iterations=max_iterations)
-
-        end_time = time.time()
-        elapsed_time = end_time - start_time
-        total_time += elapsed_time
-
-        # Check if it's a calculation (simple heuristic)
-        is_calculation = "calculate" in question.lower() or any(
-            symbol in question for symbol in "+-*/^"
-        )
-
-        # Check if the response contains a numerical result
-        has_computation_result = "The result is" in response
-
-        # This is a simple success heuristic - updated for the new agent implementation
-        success = (
-            has_computation_result if is_calculation else (
-                len(response.strip()) > 20)
-        )
-
-        result = {
-            "question": question,
-            "is_calculation": is_calculation,
-            "time_seconds": round(elapsed_time, 2),
-            "response_length": len(response),
-            "used_tool": has_computation_result,
-            "success": success,
-            "response": response[:200] + "..." if len(response) > 200 else response
-        }
-
-        results.append(result)
-
-        print(
-            f"Time: {result['time_seconds']:.2f}s, Success: {result['success']}")
+    all_tools_prompt_tokens = estimate_system_prompt_tokens(get_all_tools())
+
+    warm_up_report = None
+    residency = None
+    if warm:
+        warm_up_report = warm_up(models)
+        residency = ResidencyManager(models).start()
+
+    agent_session = None
+    if session:
+        agent_session = AgentSession(history_token_budget=history_token_budget)
+
+    try:
+        for i, case in enumerate(cases, 1):
+            question = case["question"]
+            print(f"\n[{i}/{len(questions)}] Testing: {question}")
+            counter = IterationCounter()
+            callbacks = [counter]
+
+            profiler = None
+            if profile_dir:
+                # Label profiles with the query class so regressions can be traced to it
+                label = f"q{i:02d}_{route_query(question)}_{slugify(question)}"
+                profiler = AgentProfiler(profile_dir, label)
+                callbacks.append(profiler.callback)
+                profiler.start()
+
+            start_time = time.time()
+
+            run = agent_session.run if agent_session else run_agent
+            try:
+                response = run(
+                    question,
+                    max_iterations=max_iterations,
+                    constrained_output=constrained_output,
+                    callbacks=callbacks,
+                    hedge=hedge,
+                    hedge_delay=hedge_delay,
+                    tool_top_k=tool_top_k,
+                    models=models
+                )
+                end_time = time.time()
+            finally:
+                # A failed query must not leave the profiler and its sampler
+                # thread running into the next one
+                if profiler is not None:
+                    profiler.summary = profiler.stop()
+
+            if profiler is not None:
+                print_profile_summary(profiler)
+            elapsed_time = end_time - start_time
+            total_time += elapsed_time
+
+            # Check if it's a calculation (simple heuristic)
+            is_calculation = "calculate" in question.lower() or any(
+                symbol in question for symbol in "+-*/^"
+            )
+
+            # Check if the response contains a numerical result
+            has_computation_result = "The result is" in response
+
+            # Typed expectations where the case has them, the old heuristic otherwise
+            evaluation = check_case(case, response, counter.tools_used)
+
+            tools = select_tools(question, top_k=tool_top_k) if tool_top_k else get_all_tools()
+
+            result = {
+                "question": question,
+                "is_calculation": is_calculation,
+                "time_seconds": round(elapsed_time, 2),
+                "response_length": len(response),
+                "used_tool": has_computation_result,
+                "tools_used": counter.tools_used,
+                "llm_calls": counter.llm_calls,
+                "parse_errors": counter.parse_errors,
+                # Prompt size of the first LLM call of the turn (system prompt,
+                # history and query, before any scratchpad)
+                "prompt_tokens": counter.prompt_tokens[0] if counter.prompt_tokens else 0,
+                "tools": [tool.name for tool in tools],
+                "system_prompt_tokens": estimate_system_prompt_tokens(tools),
+                "models_used": sorted({attempt["model"] for attempt in counter.attempts}),
+                "model_attempts": counter.attempts,
+                "profile": profiler.summary if profiler else None,
+                "success": evaluation["success"],
+                "checks": evaluation["checks"],
+                "response": response[:200] + "..." if len(response) > 200 else response
+            }
+
+            results.append(result)
+
+            print(
+                f"Time: {result['time_seconds']:.2f}s, LLM calls: {result['llm_calls']}, "
+                f"Prompt tokens: {result['prompt_tokens']}, "
+                f"Parse errors: {result['parse_errors']}, Success: {result['success']}")
+    finally:
+        # The refresh thread would otherwise keep calling Ollama after a failed run
+        if residency is not None:
+            residency.stop()
+
+    model_usage, escalations = summarize_model_usage(
+        [attempt for r in results for attempt in r["model_attempts"]], model_costs)
 
     summary = {
+        # Everything that changes what is being measured, so runs in the
+        # history are only compared like for like
+        "config": {
+            "models": models or [DEFAULT_MODEL],
+            "questions": len(questions),
+            "max_iterations": max_iterations,
+            "constrained_output": constrained_output,
+            "hedge": hedge,
+            "hedge_delay": hedge_delay if hedge else None,
+            "session": session,
+            "history_token_budget": history_token_budget if session else None,
+            "tool_top_k": tool_top_k,
+            "warm": warm,
+            "profiled": bool(profile_dir),
+        },
         "total_questions": len(questions),
+        "constrained_output": constrained_output,
+        "hedge": hedge,
+        "session": session,
+        "models": models or [DEFAULT_MODEL],
         "total_time": round(total_time, 2),
         "average_time": round(total_time / len(questions), 2),
+        "latency": latency_stats([r["time_seconds"] for r in results]),
+        "average_llm_calls": round(
+            sum(r["llm_calls"] for r in results) / len(results), 2),
+        "total_parse_errors": sum(r["parse_errors"] for r in results),
+        "max_prompt_tokens": max(r["prompt_tokens"] for r in results),
+        "system_prompt_tokens": {
+            "all_tools": all_tools_prompt_tokens,
+            "average_selected": round(
+                sum(r["system_prompt_tokens"] for r in results) / len(results), 1),
+        },
         "success_rate": sum(r["success"] for r in results) / len(results),
+        "model_usage": model_usage,
+        "escalations": escalations,
+        "warm_up": warm_up_report,
         "results": results
     }
 
     print(f"\nBenchmark complete!")
     print(f"Total time: {summary['total_time']:.2f}s")
     print(f"Average time per question: {summary['average_time']:.2f}s")
+    print(f"Latency p50/p95/p99: {summary['latency']['p50']:.2f}s / "
+          f"{summary['latency']['p95']:.2f}s / {summary['latency']['p99']:.2f}s")
+    print(f"Average LLM calls per question: {summary['average_llm_calls']:.2f}")
+    print(f"Parse-error retry rounds: {summary['total_parse_errors']}")
+    print(f"Largest prompt: ~{summary['max_prompt_tokens']} tokens")
+    print(f"System prompt: ~{summary['system_prompt_tokens']['all_tools']} tokens with all tools, "
+          f"~{summary['system_prompt_tokens']['average_selected']} on average as sent")
     print(f"Success rate: {summary['success_rate'] * 100:.1f}%")
+    for model, stats in model_usage.items():
+        print(f"  {model}: {stats['calls']} calls, {stats['average_latency']:.2f}s avg, "
+              f"{stats['prompt_tokens']}+{stats['completion_tokens']} tokens, cost {stats['cost']}")
+    if escalations:
+        print(f"Step escalations: {escalations}")
 
     if output_file:
         with open(output_file, 'w') as f:
@@ -110,6 +308,393 @@ def run_benchmark(questions=None, output_file=None, max_iterations=5):
     return summary
 
 
+def print_latency_comparison(title, runs):
+    """Print the latency percentiles and success rate of several benchmark runs."""
+    print(f"\n{title}:")
+    print(f"{'':10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'success':>8}")
+    for label, summary in runs.items():
+        latency = summary["latency"]
+        print(f"{label:10} {latency['p50']:>7.2f}s {latency['p95']:>7.2f}s "
+              f"{latency['p99']:>7.2f}s {latency['max']:>7.2f}s "
+              f"{summary['success_rate'] * 100:>7.1f}%")
+
+
+def compare_hedging(questions=None, output_file=None, max_iterations=5,
+                    constrained_output=False, hedge_delay=2.0):
+    """
+    Run the benchmark with and without hedging and compare tail latency.
+
+    Args:
+        questions: List of questions to test with
+        output_file: File to save the comparison to (JSON format)
+        max_iterations: Maximum number of iterations for each agent run
+        constrained_output: Request schema-constrained JSON from the model
+        hedge_delay: Seconds before the hedged direct-answer path starts
+
+    Returns:
+        Dictionary with both benchmark summaries
+    """
+    runs = {}
+    for label, hedge in (("baseline", False), ("hedged", True)):
+        print(f"\n=== {label} run ===")
+        runs[label] = run_benchmark(
+            questions=questions,
+            max_iterations=max_iterations,
+            constrained_output=constrained_output,
+            hedge=hedge,
+            hedge_delay=hedge_delay
+        )
+
+    print_latency_comparison(f"Hedging comparison (hedge delay {hedge_delay}s)", runs)
+
+    comparison = {"hedge_delay": hedge_delay, "runs": runs}
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(comparison, f, indent=2)
+        print(f"Results saved to {output_file}")
+
+    return comparison
+
+
+def compare_logging(questions=None, output_file=None, max_iterations=5,
+                    constrained_output=False):
+    """
+    Run the benchmark under each logging mode and compare latency.
+
+    The modes are quiet (warnings only, the batch default), verbose through
+    the queue-backed handler, and verbose with synchronous console writes on
+    the agent's threads, which is what the old print-based output did.
+
+    Args:
+        questions: List of questions to test with
+        output_file: File to save the comparison to (JSON format)
+        max_iterations: Maximum number of iterations for each agent run
+        constrained_output: Request schema-constrained JSON from the model
+
+    Returns:
+        Dictionary with the benchmark summary of each mode
+    """
+    modes = {
+        "quiet": {"level": logging.WARNING},
+        "queued": {"level": logging.DEBUG, "stream_tokens": True},
+        "sync": {"level": logging.DEBUG, "stream_tokens": True, "queued": False},
+    }
+
+    runs = {}
+    try:
+        for label, options in modes.items():
+            print(f"\n=== {label} logging run ===")
+            configure_logging(**options)
+            runs[label] = run_benchmark(
+                questions=questions,
+                max_iterations=max_iterations,
+                constrained_output=constrained_output
+            )
+    finally:
+        configure_logging(logging.WARNING)
+
+    print_latency_comparison("Logging comparison", runs)
+
+    comparison = {"runs": runs}
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(comparison, f, indent=2)
+        print(f"Results saved to {output_file}")
+
+    return comparison
+
+
+def evaluate_case(case, models=None, settings=None, max_iterations=5):
+    """
+    Answer one case and check the answer.
+
+    Args:
+        case: Case from as_case
+        models: Model cascade, cheapest first
+        settings: Generation config: Ollama "options", "constrained_output"
+            and "tool_top_k"
+        max_iterations: Maximum number of iterations for the agent run
+
+    Returns:
+        Result dict with latency, success, checks and token usage
+    """
+    settings = settings or {}
+    counter = IterationCounter()
+    error = None
+    start_time = time.time()
+    try:
+        response = run_agent(
+            case["question"],
+            max_iterations=max_iterations,
+            constrained_output=settings.get("constrained_output", False),
+            callbacks=[counter],
+            tool_top_k=settings.get("tool_top_k"),
+            models=models,
+            options=settings.get("options")
+        )
+    except Exception as e:
+        # One broken cell shouldn't take the rest of the matrix down
+        response = ""
+        error = f"{type(e).__name__}: {e}"
+    elapsed_time = time.time() - start_time
+
+    evaluation = check_case(case, response, counter.tools_used)
+    return {
+        "question": case["question"],
+        "time_seconds": round(elapsed_time, 2),
+        "success": evaluation["success"] and error is None,
+        "checks": evaluation["checks"],
+        "tools_used": counter.tools_used,
+        "llm_calls": counter.llm_calls,
+        "tokens": sum(attempt.get("prompt_tokens", 0) + attempt.get("completion_tokens", 0)
+                      for attempt in counter.attempts),
+        "model_attempts": counter.attempts,
+        "error": error,
+        "response": response[:200] + "..." if len(response) > 200 else response
+    }
+
+
+def _dominates(a, b):
+    """Whether cell a is at least as good as b on every axis and better on one."""
+    better_or_equal = (
+        a["accuracy"] >= b["accuracy"],
+        a["latency"]["p50"] <= b["latency"]["p50"],
+        a["latency"]["p99"] <= b["latency"]["p99"],
+        a["average_tokens"] <= b["average_tokens"],
+    )
+    strictly_better = (
+        a["accuracy"] > b["accuracy"],
+        a["latency"]["p50"] < b["latency"]["p50"],
+        a["latency"]["p99"] < b["latency"]["p99"],
+        a["average_tokens"] < b["average_tokens"],
+    )
+    return all(better_or_equal) and any(strictly_better)
+
+
+def mark_pareto(cells):
+    """
+    Mark the cells no other cell beats on accuracy, p50, p99 and tokens at once.
+
+    Args:
+        cells: Matrix cells; each gets a "pareto" flag
+    """
+    for cell in cells:
+        cell["pareto"] = not any(_dominates(other, cell) for other in cells if other is not cell)
+
+
+def meets_slo(cell, slo_p50=None, slo_p99=None, min_accuracy=None):
+    """Whether a cell meets the latency SLO and the accuracy floor, where given."""
+    return ((slo_p50 is None or cell["latency"]["p50"] <= slo_p50)
+            and (slo_p99 is None or cell["latency"]["p99"] <= slo_p99)
+            and (min_accuracy is None or cell["accuracy"] >= min_accuracy))
+
+
+def select_cheapest(cells, slo_p50=None, slo_p99=None, min_accuracy=None):
+    """
+    Pick the cheapest cell meeting the SLO.
+
+    Cheapest means lowest cost when model costs are known, then fewest
+    tokens, then lowest p99.
+
+    Args:
+        cells: Matrix cells
+        slo_p50: Maximum p50 latency in seconds
+        slo_p99: Maximum p99 latency in seconds
+        min_accuracy: Minimum accuracy (0-1)
+
+    Returns:
+        The cheapest cell meeting the SLO, or None
+    """
+    eligible = [cell for cell in cells if meets_slo(cell, slo_p50, slo_p99, min_accuracy)]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda cell: (cell["cost"], cell["average_tokens"],
+                                           cell["latency"]["p99"]))
+
+
+def print_matrix(cells, choice=None):
+    """Print the matrix as a table, most accurate first; * marks the Pareto front."""
+    width = max([len(cell["label"]) for cell in cells] + [4])
+    print(f"\n{'cell':{width}} {'accuracy':>8} {'p50':>8} {'p99':>8} "
+          f"{'tokens':>8} {'cost':>8}  pareto")
+    for cell in sorted(cells, key=lambda c: (-c["accuracy"], c["latency"]["p99"])):
+        print(f"{cell['label']:{width}} {cell['accuracy'] * 100:>7.1f}% "
+              f"{cell['latency']['p50']:>7.2f}s {cell['latency']['p99']:>7.2f}s "
+              f"{cell['average_tokens']:>8.0f} {cell['cost']:>8.4f}  "
+              f"{'*' if cell['pareto'] else ''}"
+              f"{'  <- cheapest meeting SLO' if cell is choice else ''}")
+
+
+def run_matrix(questions=None, model_sets=None, generation_configs=None, output_file=None,
+               max_iterations=5, parallel=1, model_costs=None, slo_p50=None, slo_p99=None,
+               min_accuracy=None, warm=False):
+    """
+    Run the questions for every combination of models and generation config.
+
+    Each combination is a cell. Cells report accuracy against the typed
+    expectations, p50/p99 latency and tokens per question, and are marked
+    when they are on the Pareto front of those. With parallel > 1, questions
+    from all cells run concurrently; only use that when Ollama is set up to
+    serve that many requests and models at once (OLLAMA_NUM_PARALLEL,
+    OLLAMA_MAX_LOADED_MODELS), or queueing will show up as latency.
+
+    Args:
+        questions: List of questions or typed cases to test with
+        model_sets: List of model cascades, one per matrix row
+        generation_configs: Mapping of config name to settings: Ollama
+            "options", "constrained_output" and "tool_top_k"
+        output_file: File to save the matrix to (JSON format)
+        max_iterations: Maximum number of iterations for each agent run
+        parallel: Number of questions to run at once
+        model_costs: Mapping of model name to cost per 1k tokens
+        slo_p50: Maximum p50 latency in seconds for the cheapest-cell pick
+        slo_p99: Maximum p99 latency in seconds for the cheapest-cell pick
+        min_accuracy: Minimum accuracy (0-1) for the cheapest-cell pick
+        warm: Warm up every model before the run
+
+    Returns:
+        Dictionary with the cells and the cheapest cell meeting the SLO
+    """
+    cases = [as_case(q) for q in (DEFAULT_CASES if questions is None else questions)]
+    model_sets = model_sets or [[DEFAULT_MODEL]]
+    generation_configs = generation_configs or {"default": {}}
+
+    cells = []
+    for models in model_sets:
+        for name, settings in generation_configs.items():
+            cells.append({
+                "label": f"{'>'.join(models)} / {name}",
+                "models": models,
+                "generation_config": name,
+                # Same shape as run_benchmark's config, so cells can be
+                # recorded in the benchmark history
+                "config": {
+                    "models": models,
+                    "questions": len(cases),
+                    "max_iterations": max_iterations,
+                    "constrained_output": settings.get("constrained_output", False),
+                    "tool_top_k": settings.get("tool_top_k"),
+                    "options": settings.get("options"),
+                    "parallel": parallel,
+                    "warm": warm,
+                    "matrix": True,
+                },
+                "settings": settings,
+            })
+
+    print(f"Running a {len(model_sets)}x{len(generation_configs)} matrix "
+          f"of {len(cases)} questions with {parallel} at a time...")
+
+    if warm:
+        warm_up(sorted({model for models in model_sets for model in models}))
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        futures = [[pool.submit(evaluate_case, case, cell["models"], cell["settings"],
+                                max_iterations) for case in cases] for cell in cells]
+        for cell, cell_futures in zip(cells, futures):
+            results = [future.result() for future in cell_futures]
+            cell["model_usage"], _ = summarize_model_usage(
+                [attempt for r in results for attempt in r["model_attempts"]], model_costs)
+            cell["results"] = results
+            cell["accuracy"] = sum(r["success"] for r in results) / len(results)
+            cell["success_rate"] = cell["accuracy"]
+            cell["latency"] = latency_stats([r["time_seconds"] for r in results])
+            cell["average_tokens"] = round(sum(r["tokens"] for r in results) / len(results), 1)
+            cell["cost"] = round(sum(usage["cost"] for usage in cell["model_usage"].values()), 4)
+            cell["errors"] = sum(r["error"] is not None for r in results)
+            print(f"{cell['label']}: accuracy {cell['accuracy'] * 100:.1f}%, "
+                  f"p50 {cell['latency']['p50']:.2f}s, p99 {cell['latency']['p99']:.2f}s"
+                  f"{', errors: ' + str(cell['errors']) if cell['errors'] else ''}")
+
+    mark_pareto(cells)
+    choice = select_cheapest(cells, slo_p50, slo_p99, min_accuracy)
+    print_matrix(cells, choice)
+    if slo_p50 is not None or slo_p99 is not None or min_accuracy is not None:
+        print(f"\nCheapest cell meeting the SLO: {choice['label']}" if choice
+              else "\nNo cell meets the SLO")
+
+    matrix = {
+        "slo": {"p50": slo_p50, "p99": slo_p99, "min_accuracy": min_accuracy},
+        "cells": cells,
+        "choice": choice["label"] if choice else None,
+    }
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(matrix, f, indent=2)
+        print(f"Results saved to {output_file}")
+
+    return matrix
+
+
+def record_matrix(matrix, history_file=DEFAULT_HISTORY_FILE, label=None):
+    """
+    Record every cell of an evaluation matrix in the benchmark history.
+
+    Each cell's label names its model cascade and generation config,
+    appended to the run's label, so the cells of one matrix run can be
+    told apart in the history.
+
+    Args:
+        matrix: Result of run_matrix
+        history_file: JSON lines file to append to
+        label: Optional name for the matrix run, e.g. "baseline"
+
+    Returns:
+        The stored records, one per cell
+    """
+    return [append_run(cell, history_file,
+                       label=f"{label} ({cell['label']})" if label else cell["label"])
+            for cell in matrix["cells"]]
+
+
+def parse_model_cost(value):
+    """
+    Parse a MODEL=COST entry from the command line.
+
+    Args:
+        value: e.g. "qwen2.5:7b=0.02"
+
+    Returns:
+        Tuple of (model, cost per 1k tokens)
+    """
+    model, _, cost = value.rpartition("=")
+    try:
+        cost = float(cost)
+    except ValueError:
+        cost = None
+    if not model or cost is None or not math.isfinite(cost) or cost < 0:
+        raise argparse.ArgumentTypeError(
+            f"Expected MODEL=COST with a non-negative cost per 1k tokens, got {value!r}")
+    return model, cost
+
+
+def parse_generation_config(value):
+    """
+    Parse a NAME=JSON generation config from the command line.
+
+    The JSON object holds Ollama options; "constrained_output" and
+    "tool_top_k" are taken out as agent settings.
+
+    Args:
+        value: e.g. 'greedy={"temperature": 0, "num_ctx": 2048}'
+
+    Returns:
+        Tuple of (name, settings)
+    """
+    name, _, raw = value.partition("=")
+    try:
+        options = json.loads(raw) if raw else {}
+    except json.JSONDecodeError as e:
+        raise argparse.ArgumentTypeError(f"Invalid JSON in generation config {name!r}: {e}")
+    if not name or not isinstance(options, dict):
+        raise argparse.ArgumentTypeError(
+            f"Expected NAME=JSON object for a generation config, got {value!r}")
+    settings = {key: options.pop(key) for key in ("constrained_output", "tool_top_k")
+                if key in options}
+    settings["options"] = options or None
+    return name, settings
+
+
 def main():
     """Main entry point for the benchmark script"""
     parser = argparse.ArgumentParser(
@@ -120,7 +705,8 @@ def main():
     parser.add_argument(
         '--questions-file',
         type=str,
-        help='Path to a file containing questions, one per line'
+        help='Path to a file containing questions, one per line, or typed cases '
+             'with expected answers (.json list or .jsonl)'
     )
 
     parser.add_argument(
@@ -137,25 +723,243 @@ def main():
         help='Maximum number of iterations for each agent run'
     )
 
+    parser.add_argument(
+        '--constrained-output',
+        action='store_true',
+        help='Constrain model output to the tool action JSON schema'
+    )
+
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        help='Race the direct-answer path against the agent for unsure queries'
+    )
+
+    parser.add_argument(
+        '--hedge-delay',
+        type=float,
+        default=2.0,
+        help='Seconds to wait for the agent before starting the hedged direct-answer path'
+    )
+
+    parser.add_argument(
+        '--session',
+        action='store_true',
+        help='Run the questions as consecutive turns of one conversation session'
+    )
+
+    parser.add_argument(
+        '--history-token-budget',
+        type=int,
+        default=1024,
+        help='Token budget for session history (with --session)'
+    )
+
+    parser.add_argument(
+        '--tool-top-k',
+        type=int,
+        help='Only include the instructions of the k most relevant tools per question'
+    )
+
+    parser.add_argument(
+        '--models',
+        type=parse_models,
+        help='Comma-separated model cascade, cheapest first (e.g. qwen2.5:1.5b,qwen2.5:7b)'
+    )
+
+    parser.add_argument(
+        '--model-cost',
+        action='append',
+        default=[],
+        type=parse_model_cost,
+        metavar='MODEL=COST',
+        help='Cost per 1k tokens for a model, for cost accounting (repeatable)'
+    )
+
+    parser.add_argument(
+        '--warm-up',
+        action='store_true',
+        help='Warm up the models before the run and keep them resident during it'
+    )
+
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='profiles',
+        metavar='DIR',
+        help='Profile each question separately (pstats, collapsed stacks, allocations) into DIR'
+    )
+
+    parser.add_argument(
+        '--compare-hedging',
+        action='store_true',
+        help='Run the questions with and without hedging and compare tail latency'
+    )
+
+    parser.add_argument(
+        '--compare-logging',
+        action='store_true',
+        help='Run the questions with quiet, queued verbose and synchronous verbose logging and compare latency'
+    )
+
+    parser.add_argument(
+        '--matrix-model',
+        action='append',
+        type=parse_models,
+        default=[],
+        metavar='MODELS',
+        help='Run an evaluation matrix over this model cascade (repeatable, comma-separated)'
+    )
+
+    parser.add_argument(
+        '--generation-config',
+        action='append',
+        type=parse_generation_config,
+        default=[],
+        metavar='NAME=JSON',
+        help='Matrix generation config: Ollama options as JSON, plus optional '
+             'constrained_output and tool_top_k (repeatable)'
+    )
+
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        default=1,
+        help='Matrix questions to run at once (match OLLAMA_NUM_PARALLEL)'
+    )
+
+    parser.add_argument(
+        '--slo-p50',
+        type=float,
+        help='Matrix SLO: maximum p50 latency in seconds'
+    )
+
+    parser.add_argument(
+        '--slo-p99',
+        type=float,
+        help='Matrix SLO: maximum p99 latency in seconds'
+    )
+
+    parser.add_argument(
+        '--min-accuracy',
+        type=float,
+        help='Matrix SLO: minimum accuracy (0-1)'
+    )
+
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Log the agent trace and stream model tokens (off by default to keep timings clean)'
+    )
+
+    parser.add_argument(
+        '--history-file',
+        default=DEFAULT_HISTORY_FILE,
+        help='Append the run, tagged with git revision, models and config, to this history file'
+    )
+
+    parser.add_argument(
+        '--no-history',
+        action='store_true',
+        help='Do not record the run in the history file'
+    )
+
+    parser.add_argument(
+        '--label',
+        help='Name for the run in the history, e.g. "baseline"'
+    )
+
+    parser.add_argument(
+        '--compare-to',
+        nargs='?',
+        const='',
+        metavar='REF',
+        help='After the run, compare it against a stored run (label, run id or commit; '
+             'default: the previous run with the same config) and exit 1 on regression'
+    )
+
     args = parser.parse_args()
 
-    questions = DEFAULT_QUESTIONS
+    if args.verbose:
+        configure_logging(logging.DEBUG, stream_tokens=True)
+
+    model_costs = dict(args.model_cost)
+
+    questions = DEFAULT_CASES
     if args.questions_file:
         try:
-            with open(args.questions_file, 'r') as f:
-                questions = [line.strip() for line in f if line.strip()]
+            questions = load_cases(args.questions_file)
         except Exception as e:
             print(f"Error reading questions file: {e}")
             return 1
 
-    run_benchmark(
+    if args.matrix_model or args.generation_config:
+        matrix = run_matrix(
+            questions=questions,
+            model_sets=args.matrix_model or [args.models or [DEFAULT_MODEL]],
+            generation_configs=dict(args.generation_config) or None,
+            output_file=args.output_file,
+            max_iterations=args.max_iterations,
+            parallel=args.parallel,
+            model_costs=model_costs,
+            slo_p50=args.slo_p50,
+            slo_p99=args.slo_p99,
+            min_accuracy=args.min_accuracy,
+            warm=args.warm_up
+        )
+        if not args.no_history:
+            for record in record_matrix(matrix, args.history_file, args.label):
+                print(f"{record['label']}: run {record['run_id']} recorded in "
+                      f"{args.history_file}")
+        return 0
+
+    if args.compare_hedging:
+        compare_hedging(
+            questions=questions,
+            output_file=args.output_file,
+            max_iterations=args.max_iterations,
+            constrained_output=args.constrained_output,
+            hedge_delay=args.hedge_delay
+        )
+        return 0
+
+    if args.compare_logging:
+        compare_logging(
+            questions=questions,
+            output_file=args.output_file,
+            max_iterations=args.max_iterations,
+            constrained_output=args.constrained_output
+        )
+        return 0
+
+    summary = run_benchmark(
         questions=questions,
         output_file=args.output_file,
-        max_iterations=args.max_iterations
+        max_iterations=args.max_iterations,
+        constrained_output=args.constrained_output,
+        hedge=args.hedge,
+        hedge_delay=args.hedge_delay,
+        session=args.session,
+        history_token_budget=args.history_token_budget,
+        tool_top_k=args.tool_top_k,
+        models=args.models,
+        model_costs=model_costs,
+        warm=args.warm_up,
+        profile_dir=args.profile
     )
 
+    if args.no_history:
+        return 0
+
+    record = append_run(summary, args.history_file, label=args.label)
+    print(f"Run {record['run_id']} recorded in {args.history_file}")
+
+    if args.compare_to is not None:
+        print()
+        return check_regression(record["run_id"], args.compare_to or None, args.history_file)
+
     return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
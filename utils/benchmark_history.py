@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Benchmark result history and regression detection for DeepSeek R1 LangGraph Agent
+
+Every benchmark run is appended to a JSON lines history file, tagged with the
+git revision, models and configuration. `compare` checks a candidate run
+against a baseline run with the same configuration and exits nonzero when
+p50 or p99 latency, or the success rate, got significantly worse.
+
+The statistics (utils/stats.py) are pure Python:
+
+- p50: one-sided Mann-Whitney U test, which compares the whole latency
+  distributions rather than their means
+- p99: bootstrap estimate of the probability that the candidate's p99 is
+  not worse, since rank tests say little about the tail
+- success rate: one-sided Fisher exact test
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from utils.stats import (bootstrap_not_worse, fisher_exact_less, mann_whitney_greater,
+                         percentile)
+
+DEFAULT_HISTORY_FILE = "benchmark_history.jsonl"
+
+
+def git_revision() -> Dict[str, Optional[object]]:
+    """
+    Get the git revision of the working tree.
+
+    Returns:
+        {"commit": hash or None, "dirty": whether there are uncommitted changes}
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": bool(status.strip())}
+
+
+def config_key(config: Dict) -> str:
+    """Short hash identifying a benchmark configuration."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def append_run(summary: Dict, history_file: str = DEFAULT_HISTORY_FILE,
+               label: Optional[str] = None) -> Dict:
+    """
+    Append a benchmark run to the history file.
+
+    Only what comparisons need is stored: per-question latency and success,
+    and the run's aggregate statistics. Responses are left out.
+
+    Args:
+        summary: Summary returned by run_benchmark
+        history_file: JSON lines file to append to
+        label: Optional name for the run, e.g. "baseline"
+
+    Returns:
+        The stored record
+    """
+    config = summary["config"]
+    timestamp = time.time()
+    git = git_revision()
+    record = {
+        "run_id": f"{int(timestamp * 1000)}-{(git['commit'] or 'nogit')[:8]}",
+        "timestamp": round(timestamp, 3),
+        "label": label,
+        "git": git,
+        "models": config["models"],
+        "config": config,
+        "config_key": config_key(config),
+        "questions": [r["question"] for r in summary["results"]],
+        "latencies": [r["time_seconds"] for r in summary["results"]],
+        "successes": [bool(r["success"]) for r in summary["results"]],
+        "latency": summary["latency"],
+        "success_rate": summary["success_rate"],
+    }
+    with open(history_file, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+
+def load_runs(history_file: str = DEFAULT_HISTORY_FILE) -> List[Dict]:
+    """
+    Load all runs from the history file, oldest first.
+
+    Args:
+        history_file: JSON lines file written by append_run
+
+    Returns:
+        List of run records
+    """
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_run(runs: List[Dict], ref: str) -> Optional[Dict]:
+    """
+    Find a run by reference.
+
+    Args:
+        runs: Runs, oldest first
+        ref: "latest", a label, a run id, or a git commit prefix; the most
+            recent match wins
+
+    Returns:
+        The matching run, or None
+    """
+    if ref == "latest":
+        return runs[-1] if runs else None
+    for run in reversed(runs):
+        commit = run["git"].get("commit") or ""
+        if ref in (run.get("label"), run["run_id"]) or (len(ref) >= 7 and commit.startswith(ref)):
+            return run
+    return None
+
+
+def find_baseline(runs: List[Dict], candidate: Dict) -> Optional[Dict]:
+    """Find the most recent run before the candidate with the same configuration."""
+    earlier = runs[:runs.index(candidate)] if candidate in runs else runs
+    for run in reversed(earlier):
+        if run["config_key"] == candidate["config_key"]:
+            return run
+    return None
+
+
+def compare_runs(baseline: Dict, candidate: Dict, latency_threshold: float = 0.10,
+                 success_threshold: float = 0.05, alpha: float = 0.05) -> Dict:
+    """
+    Check a candidate run against a baseline for regressions.
+
+    A metric regresses when it got worse by more than its threshold and the
+    difference is statistically significant at alpha.
+
+    Args:
+        baseline: Baseline run record
+        candidate: Candidate run record
+        latency_threshold: Allowed relative increase of p50 and p99 latency
+        success_threshold: Allowed absolute drop of the success rate
+        alpha: Significance level
+
+    Returns:
+        {"baseline", "candidate", "checks": [...], "regressed": bool}
+    """
+    checks = []
+    for name, pct in (("p50", 50), ("p99", 99)):
+        before = percentile(baseline["latencies"], pct)
+        after = percentile(candidate["latencies"], pct)
+        change = (after - before) / before if before else 0.0
+        if pct == 50:
+            _, p_value = mann_whitney_greater(candidate["latencies"], baseline["latencies"])
+        else:
+            p_value = bootstrap_not_worse(candidate["latencies"], baseline["latencies"], pct)
+        checks.append({
+            "metric": f"{name} latency",
+            "baseline": round(before, 3),
+            "candidate": round(after, 3),
+            "change": round(change, 4),
+            "p_value": round(p_value, 4),
+            "regressed": change > latency_threshold and p_value < alpha,
+        })
+
+    before = baseline["success_rate"]
+    after = candidate["success_rate"]
+    p_value = fisher_exact_less(sum(candidate["successes"]), len(candidate["successes"]),
+                                sum(baseline["successes"]), len(baseline["successes"]))
+    checks.append({
+        "metric": "success rate",
+        "baseline": round(before, 4),
+        "candidate": round(after, 4),
+        "change": round(after - before, 4),
+        "p_value": round(p_value, 4),
+        "regressed": before - after > success_threshold and p_value < alpha,
+    })
+
+    return {
+        "baseline": baseline["run_id"],
+        "candidate": candidate["run_id"],
+        "checks": checks,
+        "regressed": any(check["regressed"] for check in checks),
+    }
+
+
+def print_comparison(comparison: Dict) -> None:
+    """Print the checks of a comparison as a table."""
+    print(f"Baseline {comparison['baseline']} vs. candidate {comparison['candidate']}")
+    print(f"{'metric':14} {'baseline':>9} {'candidate':>9} {'change':>8} {'p':>7}")
+    for check in comparison["checks"]:
+        change = (f"{check['change'] * 100:+.1f}%" if "latency" in check["metric"]
+                  else f"{check['change'] * 100:+.1f}pt")
+        print(f"{check['metric']:14} {check['baseline']:>9} {check['candidate']:>9} "
+              f"{change:>8} {check['p_value']:>7.3f}"
+              f"{'  REGRESSION' if check['regressed'] else ''}")
+    print("Regression detected" if comparison["regressed"] else "No regression")
+
+
+def print_runs(runs: List[Dict]) -> None:
+    """Print one line per stored run."""
+    for run in runs:
+        commit = (run["git"].get("commit") or "-")[:8] + ("+" if run["git"].get("dirty") else "")
+        print(f"{run['run_id']:22} {run.get('label') or '':10} {commit:10} "
+              f"{','.join(run['models']):24} {run['config_key']} "
+              f"p50 {run['latency']['p50']:.2f}s p99 {run['latency']['p99']:.2f}s "
+              f"success {run['success_rate'] * 100:.0f}%")
+
+
+def check_regression(candidate_ref: str = "latest", baseline_ref: Optional[str] = None,
+                     history_file: str = DEFAULT_HISTORY_FILE, **thresholds) -> int:
+    """
+    Compare two stored runs and report regressions.
+
+    Args:
+        candidate_ref: Run to check (see find_run)
+        baseline_ref: Run to compare against; defaults to the most recent
+            earlier run with the same configuration
+        history_file: History file to read
+        **thresholds: latency_threshold, success_threshold and alpha for
+            compare_runs
+
+    Returns:
+        Exit code: 0 without regression, 1 on regression, 2 when a run is missing
+    """
+    runs = load_runs(history_file)
+    candidate = find_run(runs, candidate_ref)
+    if candidate is None:
+        print(f"No run matching {candidate_ref!r} in {history_file}")
+        return 2
+    baseline = find_run(runs, baseline_ref) if baseline_ref else find_baseline(runs, candidate)
+    if baseline is None:
+        print(f"No baseline run for {candidate['run_id']} in {history_file}")
+        return 2
+    if baseline["config_key"] != candidate["config_key"]:
+        print("Warning: the baseline and candidate runs used different configurations")
+
+    comparison = compare_runs(baseline, candidate, **thresholds)
+    print_comparison(comparison)
+    return 1 if comparison["regressed"] else 0
+
+
+def main():
+    """Main entrypoint for the history command line"""
+    parser = argparse.ArgumentParser(
+        description='Inspect benchmark history and detect regressions',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        '--history-file',
+        default=DEFAULT_HISTORY_FILE,
+        help='Benchmark history file (JSON lines)'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help='List stored runs')
+
+    compare = commands.add_parser(
+        'compare', help='Compare a run against a baseline; exits 1 on regression',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    compare.add_argument(
+        '--candidate',
+        default='latest',
+        help='Run to check: "latest", a label, a run id or a git commit prefix'
+    )
+    compare.add_argument(
+        '--baseline',
+        help='Run to compare against (default: the previous run with the same configuration)'
+    )
+    compare.add_argument(
+        '--latency-threshold',
+        type=float,
+        default=0.10,
+        help='Allowed relative increase of p50 and p99 latency'
+    )
+    compare.add_argument(
+        '--success-threshold',
+        type=float,
+        default=0.05,
+        help='Allowed absolute drop of the success rate'
+    )
+    compare.add_argument(
+        '--alpha',
+        type=float,
+        default=0.05,
+        help='Significance level of the statistical tests'
+    )
+
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        print_runs(load_runs(args.history_file))
+        return 0
+
+    return check_regression(
+        candidate_ref=args.candidate,
+        baseline_ref=args.baseline,
+        history_file=args.history_file,
+        latency_threshold=args.latency_threshold,
+        success_threshold=args.success_threshold,
+        alpha=args.alpha
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Typed expected answers for benchmark questions
+
+A case is a question with a list of checks that must all pass:
+
+- numeric: the answer contains the value of an expression, computed by the
+  computation tool itself, e.g. {"type": "numeric", "expression": "42 * 13"}
+- keywords: the answer mentions any (or all) of some keywords,
+  e.g. {"type": "keywords", "any": ["Paris"]}
+- tool: the agent called a tool, or none with {"type": "tool", "tool": null}
+
+Plain question strings are still accepted and fall back to the old
+length/"The result is" heuristic.
+"""
+import json
+import math
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Union
+
+from src.tools.computation.tool import custom_computation
+
+NUMERIC = "numeric"
+KEYWORDS = "keywords"
+TOOL = "tool"
+CHECK_TYPES = (NUMERIC, KEYWORDS, TOOL)
+
+# Thousands separators, decimals and exponents: 1,024 / -3.5 / 1e+21
+_NUMBER = re.compile(r"-?\d+(?:,\d{3})*(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_RESULT = re.compile(r"The result is (.+)\.$")
+
+DEFAULT_CASES = [
+    {"question": "What is artificial intelligence?",
+     "expect": [{"type": KEYWORDS, "any": ["intelligence", "machine", "computer"]}]},
+    {"question": "Calculate 42 * 13",
+     "expect": [{"type": NUMERIC, "expression": "42 * 13"},
+                {"type": TOOL, "tool": "custom_computation"}]},
+    {"question": "What is the capital of France?",
+     "expect": [{"type": KEYWORDS, "any": ["Paris"]},
+                {"type": TOOL, "tool": None}]},
+    {"question": "Calculate 5 + (10 * 2)",
+     "expect": [{"type": NUMERIC, "expression": "5 + (10 * 2)"},
+                {"type": TOOL, "tool": "custom_computation"}]},
+    {"question": "Who is the author of 'Pride and Prejudice'?",
+     "expect": [{"type": KEYWORDS, "any": ["Austen"]},
+                {"type": TOOL, "tool": None}]},
+    {"question": "Calculate 100 / 4",
+     "expect": [{"type": NUMERIC, "expression": "100 / 4"},
+                {"type": TOOL, "tool": "custom_computation"}]},
+    {"question": "What is machine learning?",
+     "expect": [{"type": KEYWORDS, "any": ["data", "learn"]}]},
+    {"question": "Calculate 7 * 8 + 3",
+     "expect": [{"type": NUMERIC, "expression": "7 * 8 + 3"},
+                {"type": TOOL, "tool": "custom_computation"}]},
+    # No right answer, but it shouldn't send the agent to the calculator
+    {"question": "What is the meaning of life?",
+     "expect": [{"type": TOOL, "tool": None}]},
+    {"question": "Calculate 2^8",
+     "expect": [{"type": NUMERIC, "expression": "2^8"},
+                {"type": TOOL, "tool": "custom_computation"}]},
+]
+
+
+@lru_cache(maxsize=None)
+def expected_value(expression: str) -> float:
+    """
+    Compute the expected value of an expression with the computation tool.
+
+    Args:
+        expression: Expression in the tool's syntax, e.g. "2^8"
+
+    Returns:
+        The value
+
+    Raises:
+        ValueError: If the tool can't evaluate the expression
+    """
+    output = custom_computation.func(expression)
+    match = _RESULT.match(output)
+    try:
+        return float(match.group(1))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Can't compute the expected value of {expression!r}: {output}")
+
+
+def extract_numbers(text: str) -> List[float]:
+    """Find all numbers in a text."""
+    return [float(number.replace(",", "")) for number in _NUMBER.findall(text)]
+
+
+def as_case(question: Union[str, Dict]) -> Dict:
+    """
+    Normalize a question into a case and validate its checks.
+
+    Args:
+        question: Question string, or {"question": ..., "expect": [...]}
+
+    Returns:
+        Case dict; "expect" is None for plain questions
+
+    Raises:
+        ValueError: If a check is malformed
+    """
+    if isinstance(question, str):
+        return {"question": question, "expect": None}
+
+    case = {"question": question["question"], "expect": question.get("expect")}
+    for check in case["expect"] or []:
+        kind = check.get("type")
+        if kind not in CHECK_TYPES:
+            raise ValueError(f"Unknown check type {kind!r} for {case['question']!r}")
+        if kind == NUMERIC:
+            expected_value(check["expression"])
+        elif kind == KEYWORDS and not (check.get("any") or check.get("all")):
+            raise ValueError(f"Keyword check for {case['question']!r} needs 'any' or 'all'")
+        elif kind == TOOL and "tool" not in check:
+            raise ValueError(f"Tool check for {case['question']!r} needs 'tool'")
+    return case
+
+
+def load_cases(path: str) -> List[Dict]:
+    """
+    Load benchmark cases from a file.
+
+    .json files hold a list of cases, .jsonl files one case per line, and
+    any other file one plain question per line.
+
+    Args:
+        path: File to read
+
+    Returns:
+        List of cases
+    """
+    with open(path) as f:
+        if path.endswith(".json"):
+            items = json.load(f)
+        elif path.endswith(".jsonl"):
+            items = [json.loads(line) for line in f if line.strip()]
+        else:
+            items = [line.strip() for line in f if line.strip()]
+    return [as_case(item) for item in items]
+
+
+def heuristic_success(question: str, response: str) -> bool:
+    """The old check for plain questions: a computed result or a non-trivial answer."""
+    is_calculation = "calculate" in question.lower() or any(
+        symbol in question for symbol in "+-*/^"
+    )
+    return "The result is" in response if is_calculation else len(response.strip()) > 20
+
+
+def run_check(check: Dict, response: str, tools_used: Sequence[str]) -> bool:
+    """
+    Run one check against an answer.
+
+    Args:
+        check: Check dict (see the module docstring)
+        response: The agent's answer
+        tools_used: Names of the tools the agent called
+
+    Returns:
+        Whether the check passed
+    """
+    kind = check["type"]
+    if kind == NUMERIC:
+        expected = expected_value(check["expression"])
+        tolerance = check.get("tolerance", 1e-6)
+        return any(math.isclose(number, expected, rel_tol=tolerance, abs_tol=1e-9)
+                   for number in extract_numbers(response))
+    if kind == KEYWORDS:
+        text = response.lower()
+        found = [keyword.lower() in text for keyword in check.get("all") or check["any"]]
+        return all(found) if check.get("all") else any(found)
+    if check["tool"] is None:
+        return not tools_used
+    return check["tool"] in tools_used
+
+
+def check_case(case: Dict, response: str,
+               tools_used: Sequence[str] = ()) -> Dict[str, Optional[object]]:
+    """
+    Check an answer against a case's expectations.
+
+    Args:
+        case: Case from as_case
+        response: The agent's answer
+        tools_used: Names of the tools the agent called
+
+    Returns:
+        {"success": bool, "checks": [{"type", "passed"}, ...] or None for
+        plain questions}
+    """
+    if case["expect"] is None:
+        return {"success": heuristic_success(case["question"], response), "checks": None}
+    checks = [{"type": check["type"], "passed": run_check(check, response, tools_used)}
+              for check in case["expect"]]
+    return {"success": all(check["passed"] for check in checks), "checks": checks}
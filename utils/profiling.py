@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Profiling helpers for DeepSeek R1 LangGraph Agent runs
+
+Profiles are split by agent stage:
+
+- setup: everything before the agent executor starts (building the executor)
+- agent: executor overhead, prompt formatting and output parsing
+- llm: the model call, i.e. request building and stream decoding
+- tool: handing the call to the tool executor and waiting for it. Tools run
+  in the executor's worker threads and processes (src/tools/execution.py),
+  so the tool's own CPU time and allocations are not in this stage
+
+CPU profiles use the profiled thread's CPU time, so neither time spent
+blocked on the network (waiting for Ollama) nor CPU used by other threads
+(the stack sampler, hedge workers, tool pools, the log listener) shows up.
+The stack sampler drops samples taken while a thread is blocked in a socket
+read or waiting on a lock.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Stage active before any agent callback fires
+SETUP_STAGE = "setup"
+
+# Leaf frames in these modules mean the thread is blocked, not computing
+BLOCKING_MODULES = ("socket.py", "ssl.py", "selectors.py", "threading.py", "queue.py")
+
+
+def slugify(text: str, max_length: int = 40) -> str:
+    """Turn a question into a short, filesystem-safe label."""
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    return slug[:max_length].rstrip("-") or "query"
+
+
+class _StageTracker(BaseCallbackHandler):
+    """Switches the profiler's stage as the agent moves between steps."""
+
+    def __init__(self, profiler: "AgentProfiler"):
+        self.profiler = profiler
+
+    def on_chain_start(self, serialized, inputs, *, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self.profiler.push_stage("agent")
+
+    def on_chain_end(self, outputs, *, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self.profiler.pop_stage()
+
+    def on_chain_error(self, error, *, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self.profiler.pop_stage()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.profiler.push_stage("llm")
+
+    def on_llm_end(self, response, **kwargs):
+        self.profiler.pop_stage()
+
+    def on_llm_error(self, error, **kwargs):
+        self.profiler.pop_stage()
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.profiler.push_stage("tool")
+
+    def on_tool_end(self, output, **kwargs):
+        self.profiler.pop_stage()
+
+    def on_tool_error(self, error, **kwargs):
+        self.profiler.pop_stage()
+
+
+class AgentProfiler:
+    """CPU, stack and allocation profiler for one agent run.
+
+    Use it as a context manager around the run and pass `profiler.callback`
+    in the run's callbacks so the profile is broken down per stage:
+
+        with AgentProfiler("profiles", "my-query") as profiler:
+            run_agent(query, callbacks=[profiler.callback])
+
+    cProfile covers the thread that entered the profiler; the stack sampler
+    covers every thread the agent uses (e.g. hedged execution workers).
+    """
+
+    def __init__(self, output_dir: str, label: str = "run", sample_interval: float = 0.005):
+        """
+        Args:
+            output_dir: Directory the profile files are written to
+            label: Name of the subdirectory for this run
+            sample_interval: Seconds between stack samples
+        """
+        self.output_dir = os.path.join(output_dir, label)
+        self.sample_interval = sample_interval
+        self.callback = _StageTracker(self)
+
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._stages: Dict[int, List[str]] = {}
+        self._stacks: Counter = Counter()
+        self._memory: Dict[str, Dict[str, int]] = {}
+        self._memory_marks: Dict[int, List[int]] = {}
+        self._thread_id: Optional[int] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._started_tracemalloc = False
+        self._wall_time = 0.0
+
+    def start(self) -> "AgentProfiler":
+        """Start profiling in the current thread."""
+        self._thread_id = threading.get_ident()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._started_tracemalloc = True
+        self._wall_time = time.perf_counter()
+
+        self._sampler = threading.Thread(
+            target=self._sample, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+        self.push_stage(SETUP_STAGE)
+        return self
+
+    def stop(self) -> Dict:
+        """
+        Stop profiling and write the profile files.
+
+        Returns:
+            Summary of the run per stage
+        """
+        while self._stages.get(self._thread_id):
+            self.pop_stage()
+        self._stop.set()
+        self._sampler.join()
+        self._wall_time = time.perf_counter() - self._wall_time
+
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        return self._write(snapshot)
+
+    def push_stage(self, stage: str) -> None:
+        """Enter a stage in the calling thread."""
+        thread_id = threading.get_ident()
+        stack = self._stages.setdefault(thread_id, [])
+        self._switch_profile(thread_id, stack[-1] if stack else None, stage)
+        stack.append(stage)
+        self._memory_marks.setdefault(thread_id, []).append(
+            tracemalloc.get_traced_memory()[0])
+
+    def pop_stage(self) -> None:
+        """Leave the current stage in the calling thread."""
+        thread_id = threading.get_ident()
+        stack = self._stages.get(thread_id)
+        if not stack:
+            return
+        stage = stack.pop()
+        self._switch_profile(thread_id, stage, stack[-1] if stack else None)
+
+        start_memory = self._memory_marks[thread_id].pop()
+        memory = self._memory.setdefault(stage, {"net_bytes": 0})
+        memory["net_bytes"] += tracemalloc.get_traced_memory()[0] - start_memory
+
+    def _switch_profile(self, thread_id: int, old: Optional[str], new: Optional[str]) -> None:
+        # cProfile is per-thread, so only the profiled thread switches stages
+        if thread_id != self._thread_id or old == new:
+            return
+        if old is not None:
+            self._profiles[old].disable()
+        if new is not None:
+            profile = self._profiles.setdefault(new, cProfile.Profile(time.thread_time))
+            profile.enable()
+
+    def _sample(self) -> None:
+        """Record the stacks of every staged thread until stopped."""
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            for thread_id, frame in sys._current_frames().items():
+                stack = self._stages.get(thread_id)
+                if thread_id == own_id or not stack:
+                    continue
+                if os.path.basename(frame.f_code.co_filename) in BLOCKING_MODULES:
+                    continue
+
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                                  f"{code.co_firstlineno})")
+                    frame = frame.f_back
+                self._stacks[";".join([stack[-1]] + frames[::-1])] += 1
+
+    def _write(self, snapshot: tracemalloc.Snapshot) -> Dict:
+        """Write pstats, collapsed stacks and allocation reports."""
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        stages = {}
+        combined = None
+        for stage, profile in self._profiles.items():
+            profile.dump_stats(os.path.join(self.output_dir, f"{stage}.pstats"))
+            stages[stage] = {"cpu_seconds": round(pstats.Stats(profile).total_tt, 4)}
+            if combined is None:
+                combined = pstats.Stats(profile)
+            else:
+                combined.add(profile)
+        if combined is not None:
+            combined.dump_stats(os.path.join(self.output_dir, "all.pstats"))
+
+        samples = Counter()
+        for stack, count in self._stacks.items():
+            samples[stack.split(";", 1)[0]] += count
+        with open(os.path.join(self.output_dir, "stacks.collapsed"), "w") as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        snapshot.dump(os.path.join(self.output_dir, "allocations.snapshot"))
+        with open(os.path.join(self.output_dir, "allocations.txt"), "w") as f:
+            for stat in snapshot.statistics("lineno")[:25]:
+                f.write(f"{stat}\n")
+
+        for stage in set(stages) | set(samples) | set(self._memory):
+            stages.setdefault(stage, {}).update({
+                "samples": samples.get(stage, 0),
+                **self._memory.get(stage, {}),
+            })
+
+        summary = {"wall_seconds": round(self._wall_time, 4), "stages": stages}
+        with open(os.path.join(self.output_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    def __enter__(self) -> "AgentProfiler":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.summary = self.stop()
+
+
+def print_profile_summary(profiler: AgentProfiler) -> None:
+    """Print the per-stage CPU time of a finished profile."""
+    summary = profiler.summary
+    print(f"Profile written to {profiler.output_dir} (wall {summary['wall_seconds']:.2f}s)")
+    for stage, stats in sorted(summary["stages"].items()):
+        print(f"  {stage:6} cpu {stats.get('cpu_seconds', 0.0):.3f}s, "
+              f"{stats.get('samples', 0)} samples, "
+              f"net alloc {stats.get('net_bytes', 0) / 1024:.1f} KiB")
+    if "tool" in summary["stages"]:
+        print("  (tool covers dispatch to the tool executor; the tools run in its workers)")
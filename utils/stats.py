@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Pure-Python statistics for comparing benchmark runs
+"""
+import math
+import random
+from typing import List, Tuple
+
+
+def percentile(values, pct):
+    """
+    Compute a percentile using linear interpolation between closest ranks.
+
+    Args:
+        values: Sample values
+        pct: Percentile to compute (0-100)
+
+    Returns:
+        The percentile value, or 0.0 for an empty sample
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def mann_whitney_greater(candidate: List[float], baseline: List[float]) -> Tuple[float, float]:
+    """
+    One-sided Mann-Whitney U test that candidate values tend to be larger.
+
+    Uses the normal approximation with tie and continuity corrections.
+
+    Args:
+        candidate: Candidate sample
+        baseline: Baseline sample
+
+    Returns:
+        (U statistic of the candidate sample, p-value)
+    """
+    n1, n2 = len(candidate), len(baseline)
+    if not n1 or not n2:
+        return 0.0, 1.0
+
+    # Rank the pooled sample, giving ties their average rank
+    pooled = sorted([(value, 0) for value in candidate] + [(value, 1) for value in baseline])
+    ranks = [0.0] * len(pooled)
+    tie_term = 0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tied = j - i + 1
+        tie_term += tied ** 3 - tied
+        i = j + 1
+
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, pooled) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def bootstrap_not_worse(candidate: List[float], baseline: List[float], pct: float,
+                        resamples: int = 2000, seed: int = 0) -> float:
+    """
+    Bootstrap probability that the candidate's percentile is not above the baseline's.
+
+    Small values mean the candidate's percentile is reliably higher. It is
+    used as the p-value of the tail latency check.
+
+    Args:
+        candidate: Candidate sample
+        baseline: Baseline sample
+        pct: Percentile to compare (0-100)
+        resamples: Number of bootstrap resamples
+        seed: Seed for reproducible results
+
+    Returns:
+        Fraction of resamples where the candidate percentile <= the baseline's
+    """
+    if not candidate or not baseline:
+        return 1.0
+    rng = random.Random(seed)
+    not_worse = 0
+    for _ in range(resamples):
+        c = percentile([rng.choice(candidate) for _ in candidate], pct)
+        b = percentile([rng.choice(baseline) for _ in baseline], pct)
+        not_worse += c <= b
+    return not_worse / resamples
+
+
+def fisher_exact_less(candidate_successes: int, candidate_total: int,
+                      baseline_successes: int, baseline_total: int) -> float:
+    """
+    One-sided Fisher exact test that the candidate's success rate is lower.
+
+    Returns:
+        p-value
+    """
+    total_successes = candidate_successes + baseline_successes
+    total = candidate_total + baseline_total
+    if not candidate_total or not baseline_total:
+        return 1.0
+    denominator = math.comb(total, candidate_total)
+    p_value = 0.0
+    for k in range(max(0, total_successes - baseline_total), candidate_successes + 1):
+        p_value += (math.comb(total_successes, k) *
+                    math.comb(total - total_successes, candidate_total - k)) / denominator
+    return min(p_value, 1.0)